@@ -1,6 +1,11 @@
+from unittest import mock
+
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.authtoken.models import Token
 from django.contrib.auth.models import User
+from django.urls import reverse_lazy
+
+from core.models import SocialInformation
 
 TEST_USERNAME = 'mock-me-please'
 TEST_PASSWORD = 'PaSsW0rD123'
@@ -21,3 +26,35 @@ class BaseAuthorizedTestCase(APITestCase):
         cls.user, _ = User.objects.get_or_create(username=TEST_USERNAME)
         cls.token, _ = Token.objects.get_or_create(user=cls.user)
 
+
+class VKCallbackQueriesTestCase(APITestCase):
+    """Guards count of database queries made by OAuth2 callback"""
+    url = reverse_lazy("core:oauth_vk_callback")
+
+    def setUp(self):
+        super().setUp()
+        auth_response = mock.Mock(status_code=200)
+        auth_response.json.return_value = {"access_token": "external-token", "user_id": "42"}
+        patchers = (
+            mock.patch("core.utils.requests.get", return_value=auth_response),
+            mock.patch("core.utils.vk_api_call", return_value={
+                "response": [{"first_name": "First", "last_name": "Last"}],
+            }),
+        )
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_new_user_queries(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {"code": "code"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(SocialInformation.objects.get(social_user_id="42").user_id, response.json()["user_id"])
+
+    def test_existing_user_queries(self):
+        user = User.objects.create(username=TEST_USERNAME)
+        SocialInformation.objects.create(user=user, social_type="vk", social_user_id="42")
+        Token.objects.create(user=user)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"code": "code"})
+        self.assertEqual(response.json()["user_id"], user.pk)
@@ -107,9 +107,10 @@ class BaseOAuth2CallbackView(APIView):
         social_info = SocialInformation.objects.filter(
             social_type=self.integration.social_type,
             social_user_id=user_id
-        )
-        if social_info.exists():
-            user = social_info.last().user
+        ).select_related("user").last()
+        if social_info is not None:
+            user = social_info.user
+            token, _ = Token.objects.get_or_create(user=user)
         else:
             user = User.objects.create(
                 username=uuid4(),
@@ -120,7 +121,7 @@ class BaseOAuth2CallbackView(APIView):
                 social_user_id=user_id,
                 user=user
             )
-        token, _ = Token.objects.get_or_create(user=user)
+            token = Token.objects.create(user=user)
         return Response({
             "token": token.key,
             "user_id": user.pk,
@@ -12,5 +12,6 @@ then
 fi
 
 python manage.py migrate
+python manage.py createcachetable
 
 exec "$@"
\ No newline at end of file
@@ -93,6 +93,18 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Shared between processes, table is created by `manage.py createcachetable`
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'me_watch_cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -163,3 +175,59 @@ OAUTH_SETTINGS = {
         "client_token_url": os.getenv("VK_TOKEN_URL"),
     },
 }
+
+# Pictures sources
+# Base url of Yandex.Video, can be pointed to local stub server for load testing
+YANDEX_VIDEO_URL = os.getenv("YANDEX_VIDEO_URL", "https://yandex.ru/video/")
+
+# Parsers used to search pictures sources, loaded on first search in following format
+# PICTURE_PARSERS = {
+#     "parser_name": {
+#         "class": "dotted.path.to.ParserClass",
+#         "enabled": True,
+#         "options": {...},  # passed to parser constructor as keyword arguments
+#         "max_tasks": 8,  # episode tasks running at once on all scrape workers
+#     },
+#     ...
+# }
+
+PICTURE_PARSERS = {
+    "yandex": {
+        "class": "pictures.utils.YandexParser",
+        "enabled": True,
+        "options": {
+            "timeout": 10,
+            "concurrency": 4,
+        },
+        "max_tasks": 8,
+    },
+}
+
+# Days since last status update during which user is counted as active watcher
+POPULARITY_ACTIVE_DAYS = 7
+
+# Token bucket rates of searches triggering scraping, in DRF throttle rates format.
+# Searches over limit are queued and processed by process_scrape_queue command
+SCRAPE_THROTTLE_RATES = {
+    "user": "10/min",
+    "global": "60/min",
+}
+
+# Seconds during which search that found nothing isn't repeated,
+# doubled on every repeated miss up to max value
+SEARCH_MISS_TTL = 10 * 60
+SEARCH_MISS_MAX_TTL = 24 * 60 * 60
+
+# Seconds during which search failed because of unavailable sources isn't repeated
+SEARCH_FAILURE_TTL = 30
+
+# Background warming of episodes following requested one, only episodes with
+# dead links are warmed, within global rate of SCRAPE_THROTTLE_RATES
+EPISODE_PREFETCH = {
+    "enabled": True,
+    # Next episodes of the same season to warm, first episode of next season is warmed too
+    "count": 2,
+    "workers": 4,
+    # Warmings of single title running at once across all processes
+    "per_title": 1,
+}
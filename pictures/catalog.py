@@ -0,0 +1,139 @@
+import json
+from typing import Dict, Iterable, Iterator, List
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from pictures.models import EpisodeManifest, Link, Picture
+
+# Exported models in dependency order with exported fields, "pk" is always first
+CATALOG_MODELS = (
+    (Picture, ("pk", "name", "type")),
+    (Link, ("pk", "picture", "source", "season", "episode", "is_dead", "failures", "status_code",
+            "checked_at")),
+)
+
+
+def export_catalog(chunk_size: int = 2000) -> Iterator[str]:
+    """Yields catalog as json lines, one object per line
+
+    Tables are read with server-side cursors, so memory usage doesn't depend
+    on catalog size. All pictures precede links referencing them, both are
+    read from the same REPEATABLE READ snapshot, so links of pictures created
+    during export aren't exported without their pictures. Inside outer
+    transaction its isolation level is used as is.
+
+    Attributes:
+        chunk_size -- rows fetched from database cursor at once
+    """
+    encoder = DjangoJSONEncoder()
+    in_transaction = connection.in_atomic_block
+    with transaction.atomic():
+        if not in_transaction:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        for model, fields in CATALOG_MODELS:
+            label = model._meta.label_lower
+            rows = model.objects.order_by("pk").values_list(*fields).iterator(chunk_size=chunk_size)
+            for row in rows:
+                record = dict(zip(fields, row))
+                record["model"] = label
+                yield encoder.encode(record) + "\n"
+
+
+class CatalogImporter:
+    """Imports json lines produced by export_catalog in batches
+
+    Primary keys of exported rows aren't reused, so catalog may be imported
+    into database having its own pictures. Pictures are matched with existing
+    ones by name and type or created, links are attached to matched pictures
+    and skipped if the same source of episode is already stored, so import
+    may be safely repeated after failure. Manifests of pictures which got new
+    links are rebuilt with every batch.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = {model._meta.label_lower: [] for model, _ in CATALOG_MODELS}
+        self.counts = {label: 0 for label in self.buffers}
+        # Exported picture pk -> pk of matched or created picture
+        self.picture_ids: Dict[int, int] = {}
+
+    def import_pictures(self, records: List[dict]) -> int:
+        """Maps exported pictures to existing ones, creating missing, and
+        returns count of created pictures
+        """
+        keys = {(record["name"], record["type"]) for record in records}
+        existing = Picture.objects.filter(name__in={name for name, _ in keys}).order_by("-pk")
+        # Pictures are ordered by descending pk, so the oldest duplicate wins
+        picture_ids = {(name, type_): pk for pk, name, type_ in existing.values_list("pk", "name", "type")}
+        created = {key: Picture(name=key[0], type=key[1]) for key in keys if key not in picture_ids}
+        Picture.objects.bulk_create(created.values())
+        picture_ids.update((key, picture.pk) for key, picture in created.items())
+        for record in records:
+            self.picture_ids[record["pk"]] = picture_ids[(record["name"], record["type"])]
+        return len(created)
+
+    def import_links(self, records: List[dict]) -> int:
+        """Attaches links to imported pictures, skipping already stored ones,
+        rebuilds manifests of their pictures and returns count of created links
+        """
+        _, fields = CATALOG_MODELS[1]
+        fields = [field for field in fields if field not in ("pk", "picture")]
+        links = []
+        for record in records:
+            picture_id = self.picture_ids.get(record["picture"])
+            if picture_id is None:
+                raise ValueError(f"Link {record['pk']} references picture missing in catalog")
+            values = {field: record[field] for field in fields if field in record}
+            links.append(Link(picture_id=picture_id, **values))
+        stored = set(
+            Link.objects.filter(picture_id__in={link.picture_id for link in links})
+            .values_list("picture_id", "season", "episode", "source")
+        )
+        new = []
+        for link in links:
+            key = (link.picture_id, link.season, link.episode, link.source)
+            if key not in stored:
+                stored.add(key)
+                new.append(link)
+        Link.objects.bulk_create(new)
+        for picture in Picture.objects.filter(pk__in={link.picture_id for link in new}):
+            EpisodeManifest.rebuild(picture)
+        return len(new)
+
+    def flush(self):
+        """Imports all buffered records, pictures before links referencing them"""
+        importers = {"pictures.picture": self.import_pictures, "pictures.link": self.import_links}
+        with transaction.atomic():
+            for label, records in self.buffers.items():
+                if records:
+                    try:
+                        self.counts[label] += importers[label](records)
+                    except KeyError as error:
+                        raise ValueError(f"Record of {label} misses field {error}")
+                    records.clear()
+
+    def load(self, lines: Iterable[str]) -> Dict[str, int]:
+        """Imports lines and returns count of created rows per model
+
+        Raises ValueError if lines aren't valid catalog
+
+        Attributes:
+            lines -- iterable of json lines, e.g. opened file
+        """
+        buffered = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            label = record.pop("model", None)
+            if label not in self.buffers:
+                raise ValueError(f"Unknown catalog model: {label}")
+            self.buffers[label].append(record)
+            buffered += 1
+            if buffered >= self.batch_size:
+                self.flush()
+                buffered = 0
+        self.flush()
+        return self.counts
@@ -0,0 +1,6 @@
+class PictureNotFound(Exception):
+    """Raised when no parser found sources of picture"""
+
+
+class SourceUnavailable(Exception):
+    """Raised by parser when its source can't be reached"""
@@ -0,0 +1,158 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from pictures.models import EpisodeManifest, Link, Picture, ScrapeRequest, ScrapeTask
+from pictures.parsers import registry
+
+# Result of a single check: (failed, status_code)
+CheckResult = Tuple[bool, Optional[int]]
+# Link fields loaded for check: (pk, source, picture_id, season, episode, is_dead, failures)
+LinkRow = Tuple[int, str, int, int, int, bool, int]
+
+
+class LinkChecker:
+    """Checks stored Link sources in bulk and records their liveness
+
+    Links are read in primary key ordered chunks, so only one chunk is kept
+    in memory at a time, and checked concurrently with a bounded number of
+    requests in flight per host. Link is marked dead after failure_threshold
+    consecutive failed checks, so short host outage doesn't kill its links,
+    and re-scraping of newly dead links is queued.
+    """
+    # Some video hosts refuse HEAD, fallback to lightweight GET for them
+    HEAD_NOT_ALLOWED = (405, 501)
+
+    def __init__(self, concurrency: int = 32, per_host: int = 4, timeout: float = 5, chunk_size: int = 1000,
+                 failure_threshold: int = 3):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.failure_threshold = failure_threshold
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._hosts_lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """Returns semaphore limiting concurrent requests to the host of url"""
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def check(self, url: str) -> CheckResult:
+        """Checks single url, network errors are considered as failed check
+
+        Attributes:
+            url -- source url stored in Link
+        """
+        with self._host_semaphore(url):
+            try:
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+                if response.status_code in self.HEAD_NOT_ALLOWED:
+                    response = self.session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+                    response.close()
+            except requests.RequestException:
+                return True, None
+        return response.status_code >= 400, response.status_code
+
+    def iter_chunks(self, queryset: QuerySet) -> Iterator[List[LinkRow]]:
+        """Yields chunks of queryset rows using keyset pagination
+
+        Attributes:
+            queryset -- Link queryset to iterate over
+        """
+        last_pk = 0
+        while True:
+            rows = queryset.filter(pk__gt=last_pk).order_by("pk").values_list(
+                "pk", "source", "picture_id", "season", "episode", "is_dead", "failures",
+            )
+            chunk = list(rows[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][0]
+
+    def save(self, chunk: List[LinkRow], results: Dict[str, CheckResult]) -> Dict[bool, int]:
+        """Stores results for chunk with one update query per distinct outcome,
+        rebuilds manifests of pictures which links changed liveness and queues
+        re-scraping of newly dead links. Returns count of dead and alive links
+
+        Attributes:
+            chunk   -- rows that were checked
+            results -- check result for each distinct source
+        """
+        grouped = defaultdict(list)
+        changed_pictures = set()
+        newly_dead = []
+        for row in chunk:
+            pk, source, picture_id, _, _, was_dead, failures = row
+            failed, status_code = results[source]
+            # Failures are capped by threshold, so there are few distinct outcomes
+            failures = min(failures + 1, self.failure_threshold) if failed else 0
+            is_dead = failures >= self.failure_threshold
+            grouped[(is_dead, failures, status_code)].append(pk)
+            if is_dead != was_dead:
+                changed_pictures.add(picture_id)
+                if is_dead:
+                    newly_dead.append(row)
+        now = timezone.now()
+        counts = {True: 0, False: 0}
+        for (is_dead, failures, status_code), pks in grouped.items():
+            Link.objects.filter(pk__in=pks).update(
+                is_dead=is_dead, failures=failures, status_code=status_code, checked_at=now,
+            )
+            counts[is_dead] += len(pks)
+        for picture in Picture.objects.filter(pk__in=changed_pictures):
+            EpisodeManifest.rebuild(picture)
+        self.requeue(newly_dead)
+        return counts
+
+    def requeue(self, rows: List[LinkRow]):
+        """Queues re-scraping of dead links, episodes of series as scrape tasks
+        of every parser and films as deferred searches
+
+        Attributes:
+            rows -- rows of links which became dead
+        """
+        episodes = defaultdict(set)
+        for _, _, picture_id, season, episode, _, _ in rows:
+            episodes[picture_id].add((season, episode))
+        if not episodes:
+            return
+        sources = list(registry.get_parsers_by_name())
+        for picture in Picture.objects.filter(pk__in=episodes):
+            if picture.type == Picture.SERIES:
+                for source in sources:
+                    ScrapeTask.enqueue(picture, source, sorted(episodes[picture.pk]))
+            else:
+                ScrapeRequest.enqueue(picture.name)
+
+    def run(self, queryset: Optional[QuerySet] = None) -> Dict[str, int]:
+        """Checks all links from queryset and returns count of alive and dead ones
+
+        Attributes:
+            queryset -- Link queryset to check, all links by default
+        """
+        if queryset is None:
+            queryset = Link.objects.all()
+        totals = {"alive": 0, "dead": 0}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for chunk in self.iter_chunks(queryset):
+                sources = list({row[1] for row in chunk})
+                results = dict(zip(sources, executor.map(self.check, sources)))
+                for is_dead, count in self.save(chunk, results).items():
+                    totals["dead" if is_dead else "alive"] += count
+        return totals
@@ -0,0 +1,199 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import parse_qs, unquote, urljoin, urlsplit
+
+import requests
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Returns percentile of values using nearest-rank method
+
+    Attributes:
+        values  -- sorted sequence of values
+        percent -- percentile in range [0, 100]
+    """
+    if not values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class YandexStubHandler(BaseHTTPRequestHandler):
+    """Serves pages with the same markup YandexParser expects from Yandex.Video
+
+    Names containing "series" are served as series, any other as films.
+    """
+    server: "YandexStubServer"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if path.endswith("/search"):
+            name = parse_qs(url.query).get("text", [""])[0]
+            body = self.series_search_page(name) if "series" in name else self.film_page(name)
+        elif path.endswith("-серия"):
+            body = self.episode_page(path)
+        else:
+            self.send_error(404)
+            return
+        content = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        """Stub requests are not worth logging"""
+
+    def iframe(self, path: str) -> str:
+        return f'<iframe src="//{self.server.host}/embed/{path}"></iframe>'
+
+    def film_page(self, name: str) -> str:
+        return f"<html><body>{self.iframe(name)}</body></html>"
+
+    def series_search_page(self, name: str) -> str:
+        seasons = "".join('<label class="carousel__item"></label>' for _ in range(self.server.seasons))
+        return (
+            '<html><body><div class="series-navigator__main">'
+            f'<a class="series-navigator__title-link">{name}</a>{seasons}'
+            '</div></body></html>'
+        )
+
+    def episode_page(self, path: str) -> str:
+        *_, name, season, episode = path.split("/")
+        episodes = "".join(
+            f'<div class="radio-table__list-row"><label><span>{number}</span></label></div>'
+            for number in range(1, self.server.episodes + 1)
+        )
+        return f"<html><body>{episodes}{self.iframe(f'{name}/{season}/{episode}')}</body></html>"
+
+
+class YandexStubServer(ThreadingHTTPServer):
+    """Local replacement of Yandex.Video, point settings.YANDEX_VIDEO_URL to self.base_url"""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, seasons: int = 2, episodes: int = 5, delay: float = 0):
+        super().__init__(("127.0.0.1", port), YandexStubHandler)
+        self.seasons = seasons
+        self.episodes = episodes
+        self.delay = delay
+        self.host = f"127.0.0.1:{self.server_address[1]}"
+        self.base_url = f"http://{self.host}/video/"
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class Sample(NamedTuple):
+    endpoint: str
+    latency: float
+    status: Optional[int]
+    timed_out: bool = False
+
+
+class LoadRunner:
+    """Drives requests against running API with fixed arrival rate
+
+    Requests are scheduled at constant rate independently of responses,
+    latency is measured from scheduled time, so a saturated server shows up
+    as growing latency instead of silently lowered request rate. Requests
+    not answered within timeout seconds are counted as errors.
+    """
+
+    def __init__(self, base_url: str, tokens: List[str], paths: Dict[str, Callable[[Random], str]],
+                 mix: Dict[str, int], rate: float, duration: float, concurrency: int = 64,
+                 seed: Optional[int] = None, timeout: float = 10):
+        self.base_url = base_url
+        self.tokens = tokens
+        self.paths = paths
+        self.endpoints = list(mix)
+        self.weights = [mix[endpoint] for endpoint in self.endpoints]
+        self.rate = rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.random = Random(seed)
+        self.samples: List[Sample] = []
+        self._samples_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _request(self, endpoint: str, path: str, token: str, scheduled: float):
+        try:
+            response = self._session().get(
+                urljoin(self.base_url, path),
+                headers={"Authorization": f"Token {token}"},
+                allow_redirects=False,
+                timeout=self.timeout,
+            )
+            status, timed_out = response.status_code, False
+        except requests.Timeout:
+            status, timed_out = None, True
+        except requests.RequestException:
+            status, timed_out = None, False
+        sample = Sample(endpoint, time.perf_counter() - scheduled, status, timed_out)
+        with self._samples_lock:
+            self.samples.append(sample)
+
+    def run(self) -> float:
+        """Runs load for self.duration seconds and returns actual elapsed time"""
+        started = time.perf_counter()
+        interval = 1 / self.rate
+        total = int(self.rate * self.duration)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for number in range(total):
+                scheduled = started + number * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                endpoint = self.random.choices(self.endpoints, self.weights)[0]
+                path = self.paths[endpoint](self.random)
+                token = self.random.choice(self.tokens)
+                executor.submit(self._request, endpoint, path, token, scheduled)
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        """Returns throughput, errors and latency percentiles (in milliseconds) per endpoint,
+        timeouts are counted both as errors and separately
+        """
+        grouped = defaultdict(list)
+        for sample in self.samples:
+            grouped[sample.endpoint].append(sample)
+        report = {}
+        for endpoint, samples in sorted(grouped.items()):
+            latencies = sorted(sample.latency * 1000 for sample in samples)
+            errors = sum(1 for sample in samples if sample.status is None or sample.status >= 400)
+            report[endpoint] = {
+                "requests": len(samples),
+                "errors": errors,
+                "timeouts": sum(1 for sample in samples if sample.timed_out),
+                "throughput": len(samples) / elapsed,
+                "mean": sum(latencies) / len(latencies),
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1],
+            }
+        return report
+
+
+def dump_results(path: str, config: dict, report: Dict[str, dict]):
+    """Writes load test results as json for comparing between releases"""
+    with open(path, "w") as results_file:
+        json.dump({"timestamp": time.time(), "config": config, "results": report}, results_file, indent=2)
@@ -0,0 +1,64 @@
+import time
+from random import Random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from pictures.loadtest import percentile
+from pictures.models import EpisodeManifest, Link, Picture
+
+
+class Command(BaseCommand):
+    help = "Compares storage size and read latency of episode manifests against links table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=100, help="Series pictures used for reads")
+        parser.add_argument("--iterations", type=int, default=10, help="Reads per picture")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for picked pictures")
+
+    @staticmethod
+    def relation_size(model) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_total_relation_size(%s)", [model._meta.db_table])
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def measure(read, pictures, iterations) -> list:
+        """Returns sorted latencies of read calls in milliseconds"""
+        latencies = []
+        for _ in range(iterations):
+            for picture in pictures:
+                started = time.perf_counter()
+                read(picture)
+                latencies.append((time.perf_counter() - started) * 1000)
+        return sorted(latencies)
+
+    def handle(self, *args, **options):
+        picture_ids = list(
+            EpisodeManifest.objects.filter(picture__type=Picture.SERIES).values_list("picture_id", flat=True)
+        )
+        if not picture_ids:
+            raise CommandError("No series manifests found, run rebuild_manifests first")
+        random = Random(options["seed"])
+        pictures = random.sample(picture_ids, min(options["samples"], len(picture_ids)))
+
+        def read_links(picture_id):
+            return list(Link.objects.filter(picture_id=picture_id, is_dead=False, season=1)
+                        .values_list("episode", "source"))
+
+        def read_manifest(picture_id):
+            return EpisodeManifest.objects.get(picture_id=picture_id).expand().get("1", {})
+
+        results = {
+            "links": (self.relation_size(Link), self.measure(read_links, pictures, options["iterations"])),
+            "manifest": (
+                self.relation_size(EpisodeManifest),
+                self.measure(read_manifest, pictures, options["iterations"]),
+            ),
+        }
+        self.stdout.write(f"{'storage':<10}{'size, kB':>12}{'p50, ms':>10}{'p95, ms':>10}{'p99, ms':>10}")
+        for name, (size, latencies) in results.items():
+            self.stdout.write(
+                f"{name:<10}{size // 1024:>12}{percentile(latencies, 50):>10.3f}"
+                f"{percentile(latencies, 95):>10.3f}{percentile(latencies, 99):>10.3f}"
+            )
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from pictures.liveness import LinkChecker
+from pictures.models import Link
+
+
+class Command(BaseCommand):
+    help = "Checks stored links sources and marks dead ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=32, help="Total requests in flight")
+        parser.add_argument("--per-host", type=int, default=4, help="Requests in flight per host")
+        parser.add_argument("--timeout", type=float, default=5, help="Request timeout in seconds")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Links loaded from database at once")
+        parser.add_argument(
+            "--failure-threshold", type=int, default=3,
+            help="Consecutive failed checks after which link is marked dead",
+        )
+        parser.add_argument(
+            "--stale-hours", type=int, default=None,
+            help="Check only links never checked or checked more than given hours ago",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Link.objects.all()
+        if options["stale_hours"] is not None:
+            checked_before = timezone.now() - timedelta(hours=options["stale_hours"])
+            queryset = queryset.filter(Q(checked_at__isnull=True) | Q(checked_at__lt=checked_before))
+        checker = LinkChecker(
+            concurrency=options["concurrency"],
+            per_host=options["per_host"],
+            timeout=options["timeout"],
+            chunk_size=options["chunk_size"],
+            failure_threshold=options["failure_threshold"],
+        )
+        totals = checker.run(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Checked links: {totals['alive']} alive, {totals['dead']} dead"))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pictures.exceptions import SourceUnavailable
+from pictures.models import Picture, ScrapeTask
+from pictures.parsers import registry
+
+
+class Command(BaseCommand):
+    help = "Queues scraping of every episode of series for scrape workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", help="Series name as used in search")
+
+    def handle(self, *args, **options):
+        queued = 0
+        for source, parser in registry.get_parsers_by_name().items():
+            try:
+                episodes = parser.get_episodes(options["name"])
+            except SourceUnavailable as error:
+                self.stderr.write(f"Skipped {source}: {error}")
+                continue
+            if not episodes:
+                continue
+            picture, _ = Picture.objects.get_or_create(name=episodes[0].name, type=Picture.SERIES)
+            pairs = [(episode.season, episode.episode) for episode in episodes]
+            queued += ScrapeTask.enqueue(picture, source, pairs)
+        if not queued:
+            raise CommandError(f"No episodes found for {options['name']}")
+        self.stdout.write(self.style.SUCCESS(f"Queued episodes: {queued}"))
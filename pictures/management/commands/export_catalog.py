@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from pictures.catalog import export_catalog
+
+
+class Command(BaseCommand):
+    help = "Exports pictures catalog as json lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file, stdout by default")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched from database at once")
+
+    def handle(self, *args, **options):
+        output = self.stdout if options["path"] == "-" else open(options["path"], "w")
+        try:
+            output.writelines(export_catalog(chunk_size=options["chunk_size"]))
+        finally:
+            if output is not self.stdout:
+                output.close()
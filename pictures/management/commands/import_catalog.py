@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pictures.catalog import CatalogImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports pictures catalog exported by export_catalog, pictures are matched with existing ones "
+        "by name and type, already stored links are skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Input file, stdin by default")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows inserted at once")
+
+    def handle(self, *args, **options):
+        input_file = sys.stdin if options["path"] == "-" else open(options["path"])
+        try:
+            counts = CatalogImporter(batch_size=options["batch_size"]).load(input_file)
+        except ValueError as error:
+            raise CommandError(f"Wrong catalog: {error}")
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+        for label, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"Imported {label}: {count}"))
@@ -0,0 +1,138 @@
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from pictures.loadtest import LoadRunner, YandexStubServer, dump_results
+from pictures.models import Link, Picture
+
+USERNAME_PREFIX = "loadtest-"
+PICTURE_PREFIX = "loadtest_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates load against running API and reports throughput and latency per endpoint. "
+        "Target server should use the same database and, for picture_search_cold, "
+        "YANDEX_VIDEO_URL pointing to the stub started with --stub-port"
+    )
+    endpoints = ("series_list", "film_list", "picture_search", "picture_search_cold")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://localhost:8000/", help="Base url of tested server")
+        parser.add_argument(
+            "--mix", default="series_list=5,film_list=3,picture_search=2",
+            help=f"Weighted requests mix, available endpoints: {', '.join(self.endpoints)}",
+        )
+        parser.add_argument("--rate", type=float, default=50, help="Requests per second")
+        parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds")
+        parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+        parser.add_argument(
+            "--timeout", type=float, default=10, help="Seconds after which request is counted as error",
+        )
+        parser.add_argument("--users", type=int, default=20, help="Synthetic users count")
+        parser.add_argument("--catalog", type=int, default=100, help="Seeded films and series count")
+        parser.add_argument("--episodes", type=int, default=10, help="Episodes per season of seeded series")
+        parser.add_argument("--stub-port", type=int, default=None, help="Serve Yandex.Video stub on given port")
+        parser.add_argument("--stub-delay", type=float, default=0, help="Stub response delay in seconds")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for repeatable mix")
+        parser.add_argument("--output", default=None, help="Write json results to file")
+        parser.add_argument("--cleanup", action="store_true", help="Remove synthetic users and catalog and exit")
+
+    def parse_mix(self, mix: str) -> dict:
+        weights = {}
+        for item in mix.split(","):
+            endpoint, _, weight = item.partition("=")
+            if endpoint not in self.endpoints or not weight.isdigit():
+                raise CommandError(f"Wrong mix item: {item}")
+            weights[endpoint] = int(weight)
+        return weights
+
+    def seed_users(self, count: int) -> list:
+        """Creates synthetic users and returns their tokens"""
+        tokens = []
+        for number in range(count):
+            user, _ = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{number}")
+            token, _ = Token.objects.get_or_create(user=user)
+            tokens.append(token.key)
+        return tokens
+
+    def seed_catalog(self, count: int, episodes: int) -> tuple:
+        """Creates synthetic films and series and returns their names"""
+        films = [f"{PICTURE_PREFIX}film_{number}" for number in range(count)]
+        series = [f"{PICTURE_PREFIX}series_{number}" for number in range(count)]
+        for names, picture_type in ((films, Picture.FILM), (series, Picture.SERIES)):
+            for name in names:
+                picture, created = Picture.objects.get_or_create(name=name, type=picture_type)
+                if not created:
+                    continue
+                if picture_type == Picture.FILM:
+                    links = [Link(source=f"http://loadtest.url/{name}", picture=picture)]
+                else:
+                    links = [
+                        Link(source=f"http://loadtest.url/{name}/{season}/{episode}",
+                             season=season, episode=episode, picture=picture)
+                        for season in (1, 2) for episode in range(1, episodes + 1)
+                    ]
+                Link.objects.bulk_create(links)
+        return films, series
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+            Picture.objects.filter(name__startswith=PICTURE_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS("Synthetic data removed"))
+            return
+
+        mix = self.parse_mix(options["mix"])
+        tokens = self.seed_users(options["users"])
+        films, series = self.seed_catalog(options["catalog"], options["episodes"])
+        episodes = options["episodes"]
+        paths = {
+            "series_list": lambda random: reverse("pictures:series_list", kwargs={
+                "name": random.choice(series),
+                "season": random.randint(1, 2),
+                "episode": random.randint(1, episodes),
+            }),
+            "film_list": lambda random: reverse("pictures:film_list", kwargs={"name": random.choice(films)}),
+            "picture_search": lambda random: reverse("pictures:picture_search", kwargs={
+                "picture_name": random.choice(films + series),
+            }),
+            "picture_search_cold": lambda random: reverse("pictures:picture_search", kwargs={
+                "picture_name": f"{PICTURE_PREFIX}{random.choice(('film', 'series'))}_{uuid4().hex}",
+            }),
+        }
+
+        if options["stub_port"] is not None:
+            stub = YandexStubServer(port=options["stub_port"], delay=options["stub_delay"], episodes=episodes)
+            stub.start()
+            self.stdout.write(f"Yandex.Video stub is running, start server with YANDEX_VIDEO_URL={stub.base_url}")
+
+        runner = LoadRunner(
+            base_url=options["url"],
+            tokens=tokens,
+            paths=paths,
+            mix=mix,
+            rate=options["rate"],
+            duration=options["duration"],
+            concurrency=options["concurrency"],
+            seed=options["seed"],
+            timeout=options["timeout"],
+        )
+        elapsed = runner.run()
+        report = runner.report(elapsed)
+
+        self.stdout.write(
+            f"{'endpoint':<20}{'requests':>10}{'errors':>8}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}"
+        )
+        for endpoint, result in report.items():
+            self.stdout.write(
+                f"{endpoint:<20}{result['requests']:>10}{result['errors']:>8}{result['throughput']:>10.1f}"
+                f"{result['p50']:>10.1f}{result['p95']:>10.1f}{result['p99']:>10.1f}"
+            )
+        if options["output"]:
+            config = {key: options[key] for key in ("url", "mix", "rate", "duration", "concurrency", "timeout",
+                                                    "users", "catalog", "episodes", "stub_delay", "seed")}
+            dump_results(options["output"], config, report)
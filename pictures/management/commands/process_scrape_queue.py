@@ -0,0 +1,83 @@
+import time
+from datetime import timedelta
+from typing import Optional
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from pictures.exceptions import PictureNotFound
+from pictures.models import ScrapeRequest
+from pictures.scraping import scrape_picture
+from pictures.throttling import GlobalScrapeThrottle
+
+
+class Command(BaseCommand):
+    help = "Scrapes queued picture searches in priority order within global scrape rate"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds to wait when queue is empty")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before search is dropped")
+        parser.add_argument(
+            "--lease-seconds", type=int, default=600,
+            help="Seconds after which search is processed again if its processing isn't finished",
+        )
+        parser.add_argument(
+            "--retry-delay", type=int, default=60,
+            help="Seconds before failed search is retried, doubled with every failed attempt",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit when queue is empty")
+
+    def claim(self, lease_seconds: int) -> Optional[ScrapeRequest]:
+        """Leases queued search with highest priority, returns None if queue is empty
+
+        Lease is committed before scraping, so no lock is held during network requests
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            scrape_request = (
+                ScrapeRequest.objects.select_for_update(skip_locked=True)
+                .filter(Q(leased_until__isnull=True) | Q(leased_until__lt=now))
+                .order_by("-priority", "requested_at")
+                .first()
+            )
+            if scrape_request is None:
+                return None
+            scrape_request.leased_until = now + timedelta(seconds=lease_seconds)
+            scrape_request.save(update_fields=["leased_until"])
+        return scrape_request
+
+    def process(self, scrape_request: ScrapeRequest, max_attempts: int, retry_delay: int):
+        """Scrapes leased search and removes it from queue, failed search is
+        leased for retry_delay doubled with every attempt, so it's retried
+        later, until max_attempts is reached
+        """
+        # Lease may expire and be taken by other processor, its search isn't touched then
+        leased = ScrapeRequest.objects.filter(pk=scrape_request.pk, leased_until=scrape_request.leased_until)
+        try:
+            # Not wrapped in transaction, search misses stored in database cache mustn't be rolled back
+            scrape_picture(scrape_request.picture_name)
+        except PictureNotFound:
+            self.stderr.write(f"Picture not found: {scrape_request.picture_name}")
+        except Exception as error:
+            self.stderr.write(f"Failed to scrape {scrape_request.picture_name}: {error!r}")
+            attempts = scrape_request.attempts + 1
+            if attempts < max_attempts:
+                retry_at = timezone.now() + timedelta(seconds=retry_delay * 2 ** (attempts - 1))
+                leased.update(attempts=F("attempts") + 1, leased_until=retry_at)
+                return
+        leased.delete()
+
+    def handle(self, *args, **options):
+        throttle = GlobalScrapeThrottle()
+        while True:
+            scrape_request = self.claim(options["lease_seconds"])
+            if scrape_request is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            while not throttle.allow_request(None, None):
+                time.sleep(throttle.wait())
+            self.process(scrape_request, options["max_attempts"], options["retry_delay"])
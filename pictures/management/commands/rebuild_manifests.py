@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from pictures.models import EpisodeManifest, Picture
+
+
+class Command(BaseCommand):
+    help = "Rebuilds episode manifests from stored links"
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Pictures names, all pictures by default")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Pictures loaded from database at once")
+
+    def handle(self, *args, **options):
+        pictures = Picture.objects.order_by("pk")
+        if options["names"]:
+            pictures = pictures.filter(name__in=options["names"])
+        count = 0
+        for picture in pictures.iterator(chunk_size=options["chunk_size"]):
+            EpisodeManifest.rebuild(picture)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt manifests: {count}"))
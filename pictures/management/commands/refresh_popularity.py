@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from pictures.models import PicturePopularity, Status
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts pictures watchers from statuses, expiring stale active watchers. "
+        "Should be run periodically, e.g. daily"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Pictures recounted at once")
+
+    def handle(self, *args, **options):
+        active_since = PicturePopularity.active_since()
+        Status.objects.filter(counted_active=True, updated_at__lt=active_since).update(counted_active=False)
+        Status.objects.filter(counted_active=False, updated_at__gte=active_since).update(counted_active=True)
+        counts = (
+            Status.objects.values("picture_id")
+            .annotate(
+                watchers=Count("id"),
+                active_watchers=Count("id", filter=Q(counted_active=True)),
+            )
+            .order_by("picture_id")
+        )
+        refreshed = 0
+        for count in counts.iterator(chunk_size=options["chunk_size"]):
+            PicturePopularity.objects.update_or_create(
+                picture_id=count["picture_id"],
+                defaults={"watchers": count["watchers"], "active_watchers": count["active_watchers"]},
+            )
+            refreshed += 1
+        PicturePopularity.objects.exclude(picture__status__isnull=False).update(watchers=0, active_watchers=0)
+        self.stdout.write(self.style.SUCCESS(f"Refreshed pictures popularity: {refreshed}"))
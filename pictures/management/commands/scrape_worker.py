@@ -0,0 +1,29 @@
+import os
+import socket
+
+from django.core.management.base import BaseCommand
+
+from pictures.workers import ScrapeWorker
+
+
+class Command(BaseCommand):
+    help = "Runs scrape worker processing queued episode tasks, may run on several nodes at once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--node", default=f"{socket.gethostname()}-{os.getpid()}", help="Unique worker name")
+        parser.add_argument("--threads", type=int, default=4, help="Tasks running at once on this worker")
+        parser.add_argument("--lease", type=int, default=60, help="Task lease duration in seconds")
+        parser.add_argument("--heartbeat", type=int, default=20, help="Seconds between lease prolongations")
+        parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before task is failed")
+        parser.add_argument("--poll-interval", type=float, default=5, help="Seconds to wait when queue is empty")
+
+    def handle(self, *args, **options):
+        worker = ScrapeWorker(
+            node=options["node"],
+            threads=options["threads"],
+            lease_seconds=options["lease"],
+            heartbeat_seconds=options["heartbeat"],
+            max_attempts=options["max_attempts"],
+        )
+        self.stdout.write(f"Scrape worker {worker.node} started")
+        worker.run(poll_interval=options["poll_interval"])
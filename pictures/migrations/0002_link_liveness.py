@@ -0,0 +1,28 @@
+# Generated by Django 2.1.5 on 2019-03-02 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='is_dead',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='status_code',
+            field=models.SmallIntegerField(blank=True, null=True),
+        ),
+    ]
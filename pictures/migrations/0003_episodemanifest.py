@@ -0,0 +1,24 @@
+# Generated by Django 2.1.5 on 2019-03-09 12:24
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0002_link_liveness'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpisodeManifest',
+            fields=[
+                ('picture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='manifest', serialize=False, to='pictures.Picture')),
+                ('prefix', models.TextField(blank=True, default='')),
+                ('seasons', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
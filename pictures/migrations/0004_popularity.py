@@ -0,0 +1,43 @@
+# Generated by Django 2.1.5 on 2019-03-16 11:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_watchers(apps, schema_editor):
+    """Fills counters for existing statuses, all of them are just updated"""
+    Status = apps.get_model('pictures', 'Status')
+    PicturePopularity = apps.get_model('pictures', 'PicturePopularity')
+    counts = Status.objects.values('picture_id').annotate(watchers=models.Count('id')).order_by()
+    PicturePopularity.objects.bulk_create(
+        PicturePopularity(picture_id=count['picture_id'], watchers=count['watchers'], active_watchers=count['watchers'])
+        for count in counts.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0003_episodemanifest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PicturePopularity',
+            fields=[
+                ('picture', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='pictures.Picture')),
+                ('watchers', models.IntegerField(default=0)),
+                ('active_watchers', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='status',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='picturepopularity',
+            index=models.Index(fields=['-active_watchers', '-watchers'], name='pictures_pi_active__b474ec_idx'),
+        ),
+        migrations.RunPython(count_watchers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.1.5 on 2019-03-23 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0004_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeRequest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('picture_name', models.CharField(max_length=256, unique=True)),
+                ('priority', models.IntegerField(default=1)),
+                ('attempts', models.SmallIntegerField(default=0)),
+                ('requested_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='scraperequest',
+            index=models.Index(fields=['-priority', 'requested_at'], name='pictures_sc_priorit_bc4bf9_idx'),
+        ),
+    ]
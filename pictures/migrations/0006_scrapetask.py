@@ -0,0 +1,40 @@
+# Generated by Django 2.1.5 on 2019-04-06 13:15
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0005_scraperequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.SmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('episode', models.SmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('source', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('R', 'Running'), ('D', 'Done'), ('F', 'Failed')], default='P', max_length=1)),
+                ('attempts', models.SmallIntegerField(default=0)),
+                ('leased_by', models.CharField(blank=True, default='', max_length=256)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('picture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='pictures.Picture')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='scrapetask',
+            index=models.Index(fields=['source', 'status', 'lease_expires_at'], name='pictures_sc_source_f82b07_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='scrapetask',
+            unique_together={('picture', 'season', 'episode', 'source')},
+        ),
+    ]
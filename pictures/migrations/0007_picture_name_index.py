@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2019-04-13 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0006_scrapetask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='picture',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2019-04-14 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0007_picture_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='failures',
+            field=models.SmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2019-04-14 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0008_link_failures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scraperequest',
+            name='leased_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.1.5 on 2019-04-20 10:24
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def count_active_statuses(apps, schema_editor):
+    """Marks recently updated statuses as counted and recounts active watchers from them"""
+    Status = apps.get_model('pictures', 'Status')
+    PicturePopularity = apps.get_model('pictures', 'PicturePopularity')
+    active_since = timezone.now() - timedelta(days=settings.POPULARITY_ACTIVE_DAYS)
+    Status.objects.filter(updated_at__gte=active_since).update(counted_active=True)
+    PicturePopularity.objects.update(active_watchers=0)
+    counts = (
+        Status.objects.filter(counted_active=True)
+        .values('picture_id').annotate(active_watchers=models.Count('id')).order_by()
+    )
+    for count in counts.iterator():
+        PicturePopularity.objects.filter(picture_id=count['picture_id']).update(
+            active_watchers=count['active_watchers'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pictures', '0009_scraperequest_leased_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='status',
+            name='counted_active',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(count_active_statuses, migrations.RunPython.noop),
+    ]
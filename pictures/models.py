@@ -1,4 +1,12 @@
-from django.db import models
+import zlib
+from datetime import datetime, timedelta
+from os.path import commonprefix
+
+from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
 
@@ -10,6 +18,9 @@ class Status(models.Model):
     picture = models.ForeignKey(to='Picture', on_delete=models.CASCADE)
     user = models.ForeignKey(to=User, on_delete=models.CASCADE)
     finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Whether status is counted in PicturePopularity.active_watchers, kept by signals and refresh_popularity
+    counted_active = models.BooleanField(default=False)
 
 
 class Picture(models.Model):
@@ -20,7 +31,7 @@ class Picture(models.Model):
         (FILM, "Film"),
         (SERIES, "Series"),
     )
-    name = models.CharField(max_length=256)
+    name = models.CharField(max_length=256, db_index=True)
     user = models.ManyToManyField(User, through=Status)
     type = models.CharField(
         max_length=1,
@@ -35,3 +46,201 @@ class Link(models.Model):
     season = models.SmallIntegerField(validators=[MinValueValidator(1)], default=1)
     episode = models.SmallIntegerField(validators=[MinValueValidator(1)], default=1)
     picture = models.ForeignKey(to=Picture, on_delete=models.CASCADE)
+    is_dead = models.BooleanField(default=False)
+    # Consecutive failed checks, link is marked dead after LinkChecker.failure_threshold of them
+    failures = models.SmallIntegerField(default=0)
+    status_code = models.SmallIntegerField(null=True, blank=True)
+    checked_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+
+class EpisodeManifest(models.Model):
+    """Denormalized compact copy of alive picture links, read with single row fetch
+
+    Sources are stored without their common prefix in following format:
+    {
+        "season": {
+            "episode": ["source_suffix", ...],
+            ...
+        },
+        ...
+    }
+    """
+    picture = models.OneToOneField(
+        to=Picture, on_delete=models.CASCADE, primary_key=True, related_name="manifest",
+    )
+    prefix = models.TextField(blank=True, default="")
+    seasons = JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def rebuild(cls, picture: Picture) -> "EpisodeManifest":
+        """Builds manifest from alive links of picture and saves it
+
+        Attributes:
+            picture -- picture to build manifest for
+        """
+        links = list(
+            Link.objects.filter(picture=picture, is_dead=False)
+            .order_by("season", "episode", "id")
+            .values_list("season", "episode", "source")
+        )
+        prefix = commonprefix([source for _, _, source in links]) if len(links) > 1 else ""
+        seasons = {}
+        for season, episode, source in links:
+            seasons.setdefault(str(season), {}).setdefault(str(episode), []).append(source[len(prefix):])
+        manifest, _ = cls.objects.update_or_create(
+            picture=picture, defaults={"prefix": prefix, "seasons": seasons},
+        )
+        return manifest
+
+    def get_sources(self, season: int, episode: int) -> list:
+        """Returns full sources urls for given episode"""
+        suffixes = self.seasons.get(str(season), {}).get(str(episode), [])
+        return [self.prefix + suffix for suffix in suffixes]
+
+    def expand(self) -> dict:
+        """Returns manifest with full sources urls"""
+        return {
+            season: {
+                episode: [self.prefix + suffix for suffix in suffixes]
+                for episode, suffixes in episodes.items()
+            }
+            for season, episodes in self.seasons.items()
+        }
+
+
+class PicturePopularity(models.Model):
+    """Watchers counters of picture, maintained incrementally by Status signals
+
+    Active watchers are users who updated their status within
+    settings.POPULARITY_ACTIVE_DAYS days, statuses going stale are expired by
+    refresh_popularity command.
+    """
+    picture = models.OneToOneField(
+        to=Picture, on_delete=models.CASCADE, primary_key=True, related_name="popularity",
+    )
+    watchers = models.IntegerField(default=0)
+    active_watchers = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-active_watchers", "-watchers"]),
+        ]
+
+    @staticmethod
+    def active_since() -> datetime:
+        """Returns earliest status update time considered active"""
+        return timezone.now() - timedelta(days=settings.POPULARITY_ACTIVE_DAYS)
+
+    @classmethod
+    def increment(cls, picture_id: int, watchers: int = 0, active_watchers: int = 0, create: bool = True):
+        """Atomically changes counters of picture
+
+        Attributes:
+            picture_id      -- picture primary key
+            watchers        -- watchers counter change
+            active_watchers -- active watchers counter change
+            create          -- create missing counters, otherwise nothing is changed
+        """
+        changes = {
+            "watchers": F("watchers") + watchers,
+            "active_watchers": F("active_watchers") + active_watchers,
+        }
+        if not cls.objects.filter(picture_id=picture_id).update(**changes) and create:
+            cls.objects.get_or_create(picture_id=picture_id)
+            cls.objects.filter(picture_id=picture_id).update(**changes)
+
+
+class ScrapeRequest(models.Model):
+    """Deferred search of picture sources, processed by process_scrape_queue command
+
+    Priority grows with every request of the same picture, so titles wanted
+    by more users are scraped first. Processed request is leased until
+    leased_until, so it isn't locked during scraping and is processed again
+    if its processor dies. Failed request is retried after leased_until too.
+    """
+    picture_name = models.CharField(max_length=256, unique=True)
+    priority = models.IntegerField(default=1)
+    attempts = models.SmallIntegerField(default=0)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    leased_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-priority", "requested_at"]),
+        ]
+
+    @classmethod
+    def enqueue(cls, picture_name: str):
+        """Adds picture search to queue or raises its priority if already queued"""
+        if not cls.objects.filter(picture_name=picture_name).update(priority=F("priority") + 1):
+            _, created = cls.objects.get_or_create(picture_name=picture_name)
+            if not created:
+                cls.objects.filter(picture_name=picture_name).update(priority=F("priority") + 1)
+
+
+class ScrapeTask(models.Model):
+    """Episode scraping task shared by scrape workers on all nodes
+
+    Workers claim tasks with leases, which are prolonged by heartbeats while
+    task is running. Task with expired lease is claimed again by any worker.
+    """
+    PENDING = "P"
+    RUNNING = "R"
+    DONE = "D"
+    FAILED = "F"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+    picture = models.ForeignKey(to=Picture, on_delete=models.CASCADE)
+    season = models.SmallIntegerField(validators=[MinValueValidator(1)], default=1)
+    episode = models.SmallIntegerField(validators=[MinValueValidator(1)], default=1)
+    # Parser name from settings.PICTURE_PARSERS
+    source = models.CharField(max_length=64)
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.SmallIntegerField(default=0)
+    leased_by = models.CharField(max_length=256, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("picture", "season", "episode", "source")
+        indexes = [
+            models.Index(fields=["source", "status", "lease_expires_at"]),
+        ]
+
+    @classmethod
+    def enqueue(cls, picture: Picture, source: str, episodes: list) -> int:
+        """Creates pending tasks for episodes, finished ones are queued again.
+        Enqueues of the same picture are serialized by advisory lock.
+        Returns count of queued tasks
+
+        Attributes:
+            picture  -- series picture
+            source   -- parser name
+            episodes -- (season, episode) pairs
+        """
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                lock_id = zlib.crc32(f"tasks_{picture.pk}".encode())
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id])
+            tasks = cls.objects.filter(picture=picture, source=source)
+            existing = {(season, episode): status for season, episode, status
+                        in tasks.values_list("season", "episode", "status")}
+            new = [pair for pair in episodes if pair not in existing]
+            finished = [pair for pair in episodes if existing.get(pair) in (cls.DONE, cls.FAILED)]
+            cls.objects.bulk_create(
+                cls(picture=picture, source=source, season=season, episode=episode)
+                for season, episode in new
+            )
+            if finished:
+                condition = models.Q()
+                for season, episode in finished:
+                    condition |= models.Q(season=season, episode=episode)
+                tasks.filter(condition).update(status=cls.PENDING, attempts=0, error="", finished_at=None)
+        return len(new) + len(finished)
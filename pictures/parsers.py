@@ -0,0 +1,63 @@
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+if TYPE_CHECKING:
+    from pictures.utils import BaseParser
+
+
+class ParserRegistry:
+    """Registry of pictures parsers configured by settings.PICTURE_PARSERS
+
+    Parser classes are imported and instantiated on first use, so processes
+    which never search pictures don't import scraping dependencies at all.
+    """
+
+    def __init__(self, setting_name: str = "PICTURE_PARSERS"):
+        self.setting_name = setting_name
+        self._parsers: Optional[Dict[str, "BaseParser"]] = None
+        self._lock = threading.Lock()
+
+    def get_config(self, name: str) -> dict:
+        """Returns settings of parser with name"""
+        return getattr(settings, self.setting_name)[name]
+
+    def load(self) -> Dict[str, "BaseParser"]:
+        """Instantiates enabled parsers with their options"""
+        parsers = {}
+        for name, config in getattr(settings, self.setting_name).items():
+            if not config.get("enabled", True):
+                continue
+            parser_class = import_string(config["class"])
+            parsers[name] = parser_class(**config.get("options", {}))
+        return parsers
+
+    def get_parsers_by_name(self) -> Dict[str, "BaseParser"]:
+        """Returns enabled parsers by their names, loading them on first call"""
+        if self._parsers is None:
+            with self._lock:
+                if self._parsers is None:
+                    self._parsers = self.load()
+        return self._parsers
+
+    def get_parsers(self) -> List["BaseParser"]:
+        """Returns enabled parsers"""
+        return list(self.get_parsers_by_name().values())
+
+    def reset(self):
+        """Drops loaded parsers, they will be loaded again on next use"""
+        with self._lock:
+            self._parsers = None
+
+
+registry = ParserRegistry()
+
+
+@receiver(setting_changed)
+def reset_parsers(setting, **kwargs):
+    if setting == registry.setting_name:
+        registry.reset()
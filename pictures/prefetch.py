@@ -0,0 +1,123 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from pictures.models import Link, Picture
+from pictures.scraping import get_episode_miss_key, scrape_episodes, search_misses
+from pictures.throttling import GlobalScrapeThrottle
+
+
+class EpisodePrefetcher:
+    """Warms episodes following the requested one in background threads
+
+    Next episodes of the season and first episode of the next season are
+    scraped if they are known to exist, i.e. have stored links, but none of
+    them is alive. Warming takes tokens of global scrape throttle, so list
+    requests can't send more traffic to sources than searches may. Every
+    title has limited number of warmings running at once across all
+    processes, requests over the limit are skipped. Configured by
+    settings.EPISODE_PREFETCH.
+    """
+    # Seconds after which warming slot taken by dead process is freed
+    slot_timeout = 5 * 60
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> dict:
+        return settings.EPISODE_PREFETCH
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.config["workers"])
+            return self._executor
+
+    def upcoming(self, season: int, episode: int) -> List[Tuple[int, int]]:
+        """Returns (season, episode) pairs likely to be requested after given episode"""
+        following = [(season, episode + offset) for offset in range(1, self.config["count"] + 1)]
+        return following + [(season + 1, 1)]
+
+    def missing(self, picture: Picture, episodes: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Returns episodes having only dead links, which search didn't miss recently"""
+        condition = Q()
+        for season, episode in episodes:
+            condition |= Q(season=season, episode=episode)
+        stored = Link.objects.filter(condition, picture=picture).values_list("season", "episode", "is_dead")
+        known, alive = set(), set()
+        for season, episode, is_dead in stored:
+            known.add((season, episode))
+            if not is_dead:
+                alive.add((season, episode))
+        return [
+            pair for pair in episodes
+            if pair in known and pair not in alive
+            and not search_misses.is_missing(get_episode_miss_key(picture, *pair))
+        ]
+
+    def _acquire(self, name: str) -> Optional[str]:
+        """Takes free warming slot of title in shared cache, returns its key
+        or None if all slots are taken
+        """
+        prefix = f"prefetch_slot_{hashlib.md5(name.encode()).hexdigest()}"
+        for slot in range(self.config["per_title"]):
+            key = f"{prefix}_{slot}"
+            if cache.add(key, True, self.slot_timeout):
+                return key
+        return None
+
+    def _release(self, slot_key: str):
+        cache.delete(slot_key)
+
+    def warm(self, name: str, season: int, episode: int) -> list:
+        """Scrapes missing upcoming episodes of series within global scrape rate
+        and returns created links
+        """
+        picture = Picture.objects.filter(name=name, type=Picture.SERIES).first()
+        if picture is None:
+            return []
+        throttle = GlobalScrapeThrottle()
+        episodes = []
+        for pair in self.missing(picture, self.upcoming(season, episode)):
+            if not throttle.allow_request(None, None):
+                break
+            episodes.append(pair)
+        if not episodes:
+            return []
+        return scrape_episodes(picture, episodes)
+
+    def _run(self, slot_key: str, name: str, season: int, episode: int):
+        try:
+            self.warm(name, season, episode)
+        finally:
+            self._release(slot_key)
+            connection.close()
+
+    def schedule(self, name: str, season: int, episode: int) -> bool:
+        """Starts background warming after given episode, returns False if it's
+        disabled or title has too many warmings running
+
+        Attributes:
+            name    -- series name
+            season  -- requested season
+            episode -- requested episode
+        """
+        if not self.config["enabled"]:
+            return False
+        slot_key = self._acquire(name)
+        if slot_key is None:
+            return False
+        self.executor.submit(self._run, slot_key, name, season, episode)
+        return True
+
+
+prefetcher = EpisodePrefetcher()
@@ -0,0 +1,210 @@
+import hashlib
+import time
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from pictures.exceptions import PictureNotFound, SourceUnavailable
+from pictures.models import EpisodeManifest, Link, Picture
+from pictures.parsers import registry
+
+
+class SearchMissCache:
+    """Negative cache of searches which found nothing or failed
+
+    Every repeated miss doubles time during which the search is short-circuited,
+    from settings.SEARCH_MISS_TTL up to settings.SEARCH_MISS_MAX_TTL seconds.
+    Misses count is kept after that time ends, so backoff continues on next miss.
+    Failures of unavailable sources are kept separately for settings.SEARCH_FAILURE_TTL
+    seconds without backoff, they don't mean the picture doesn't exist.
+    """
+
+    @staticmethod
+    def get_cache_key(picture_name: str) -> str:
+        return f"search_miss_{hashlib.md5(picture_name.encode()).hexdigest()}"
+
+    @staticmethod
+    def get_failure_cache_key(picture_name: str) -> str:
+        return f"search_failure_{hashlib.md5(picture_name.encode()).hexdigest()}"
+
+    def is_missing(self, picture_name: str) -> bool:
+        """Returns True if search of picture should be short-circuited"""
+        entry = cache.get(self.get_cache_key(picture_name))
+        return entry is not None and entry["until"] > time.time()
+
+    def remember(self, picture_name: str):
+        """Records search miss, prolonging short-circuit time with every repeated miss"""
+        key = self.get_cache_key(picture_name)
+        misses = cache.get(key, {"misses": 0})["misses"] + 1
+        ttl = min(settings.SEARCH_MISS_TTL * 2 ** (misses - 1), settings.SEARCH_MISS_MAX_TTL)
+        cache.set(key, {"misses": misses, "until": time.time() + ttl}, ttl + settings.SEARCH_MISS_MAX_TTL)
+
+    def is_failing(self, picture_name: str) -> bool:
+        """Returns True if search of picture recently failed because of unavailable sources"""
+        return cache.get(self.get_failure_cache_key(picture_name)) is not None
+
+    def remember_failure(self, picture_name: str):
+        """Records search failed because of unavailable sources"""
+        cache.set(self.get_failure_cache_key(picture_name), True, settings.SEARCH_FAILURE_TTL)
+
+    def forget(self, picture_name: str):
+        cache.delete_many([self.get_cache_key(picture_name), self.get_failure_cache_key(picture_name)])
+
+
+search_misses = SearchMissCache()
+
+
+def get_episode_miss_key(picture: Picture, season: int, episode: int) -> str:
+    """Returns name under which search miss of series episode is remembered"""
+    return f"{picture.name}/{season}/{episode}"
+
+
+def save_links(picture: Picture, links: List[Link]) -> List[Link]:
+    """Saves scraped links of picture and returns stored links of their sources
+
+    Dead links of scraped episodes are replaced and sources already stored
+    alive aren't saved again, so repeated scrapes of the same episodes don't
+    duplicate links. Saves of the same picture are serialized by advisory lock.
+
+    Attributes:
+        picture -- picture which links belong to
+        links   -- unsaved links found by parsers
+    """
+    if not links:
+        return []
+    condition = Q()
+    for season, episode in {(link.season, link.episode) for link in links}:
+        condition |= Q(season=season, episode=episode)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [zlib.crc32(f"links_{picture.pk}".encode())])
+        stored = Link.objects.filter(condition, picture=picture)
+        stored.filter(is_dead=True).delete()
+        saved = {(link.season, link.episode, link.source): link for link in stored}
+        created = []
+        for link in links:
+            key = (link.season, link.episode, link.source)
+            if key not in saved:
+                saved[key] = link
+                created.append(link)
+        if created:
+            Link.objects.bulk_create(created)
+            EpisodeManifest.rebuild(picture)
+    keys = dict.fromkeys((link.season, link.episode, link.source) for link in links)
+    return [saved[key] for key in keys]
+
+
+def scrape_picture(picture_name: str, parsers: Optional[list] = None) -> List[Link]:
+    """Parses links with parsers and saves them into database with appropriate
+    picture attributes, replacing dead links of picture, see save_links
+
+    Raises PictureNotFound if no parser found sources and SourceUnavailable if
+    nothing is found because of failed parsers, both are remembered in search_misses,
+    as miss and failure respectively
+
+    Attributes:
+        picture_name -- internal picture_name given from request
+        parsers      -- parsers to use, configured by settings.PICTURE_PARSERS by default
+    """
+    if parsers is None:
+        parsers = registry.get_parsers()
+    sources = []
+    failure = None
+    for parser in parsers:
+        try:
+            sources.extend(parser.get_sources(picture_name))
+        except SourceUnavailable as error:
+            failure = error
+    if not sources:
+        if failure is not None:
+            search_misses.remember_failure(picture_name)
+            raise failure
+        search_misses.remember(picture_name)
+        raise PictureNotFound(picture_name)
+    search_misses.forget(picture_name)
+    with transaction.atomic():
+        Link.objects.filter(picture__name=picture_name, is_dead=True).delete()
+        picture, _ = Picture.objects.get_or_create(name=sources[0].name, type=sources[0].type)
+        links = [Link(source=link.source_url, season=link.season, episode=link.episode, picture=picture)
+                 for link in sources]
+        return save_links(picture, links)
+
+
+def find_episode_links(picture: Picture, season: int, episode: int, parsers: list) -> List[Link]:
+    """Returns unsaved links of series episode found by parsers
+
+    Raises SourceUnavailable if nothing is found because of failed parsers
+
+    Attributes:
+        picture -- series picture
+        season  -- season number
+        episode -- episode number
+        parsers -- parsers to use
+    """
+    sources = []
+    failure = None
+    for parser in parsers:
+        try:
+            sources.extend(parser.get_episode_sources(picture.name, season, episode))
+        except SourceUnavailable as error:
+            failure = error
+    if not sources and failure is not None:
+        raise failure
+    return [
+        Link(source=source.source_url, season=season, episode=episode, picture=picture)
+        for source in sources
+    ]
+
+
+def scrape_episode(picture: Picture, season: int, episode: int, parsers: Optional[list] = None) -> List[Link]:
+    """Parses sources of single series episode and saves them into database,
+    see save_links. Search misses are neither checked nor remembered, so
+    explicitly requested episode is always searched
+
+    Raises SourceUnavailable if nothing is found because of failed parsers
+
+    Attributes:
+        picture -- series picture
+        season  -- season number
+        episode -- episode number
+        parsers -- parsers to use, configured by settings.PICTURE_PARSERS by default
+    """
+    if parsers is None:
+        parsers = registry.get_parsers()
+    return save_links(picture, find_episode_links(picture, season, episode, parsers))
+
+
+def scrape_episodes(picture: Picture, episodes: Iterable[Tuple[int, int]],
+                    parsers: Optional[list] = None) -> List[Link]:
+    """Parses sources of given series episodes and saves them into database,
+    see save_links
+
+    Episodes which no parser found are remembered in search_misses, so they
+    aren't searched again until their miss expires. Episodes which failed
+    because of unavailable sources are skipped without being remembered
+
+    Attributes:
+        picture  -- series picture
+        episodes -- (season, episode) pairs to scrape
+        parsers  -- parsers to use, configured by settings.PICTURE_PARSERS by default
+    """
+    links = []
+    for season, episode in episodes:
+        miss_key = get_episode_miss_key(picture, season, episode)
+        if search_misses.is_missing(miss_key):
+            continue
+        # Parsers are loaded only if there is something to search
+        if parsers is None:
+            parsers = registry.get_parsers()
+        try:
+            found = find_episode_links(picture, season, episode, parsers)
+        except SourceUnavailable:
+            continue
+        if not found:
+            search_misses.remember(miss_key)
+        links.extend(found)
+    return save_links(picture, links)
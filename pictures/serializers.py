@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from pictures.models import Link, Picture
+from pictures.models import EpisodeManifest, Link, Picture, PicturePopularity
 
 
 class LinkSerializer(serializers.ModelSerializer):
@@ -15,4 +15,44 @@ class LinkSerializer(serializers.ModelSerializer):
             'episode',
             'picture',
             'source',
+            'is_dead',
+            'checked_at',
+        )
+        read_only_fields = (
+            'is_dead',
+            'checked_at',
+        )
+
+
+class EpisodeManifestSerializer(serializers.ModelSerializer):
+    """Serializer for picture.EpisodeManifest model with expanded sources"""
+    picture = serializers.SlugRelatedField(read_only=True, slug_field="name")
+    type = serializers.CharField(source="picture.type", read_only=True)
+    seasons = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EpisodeManifest
+        fields = (
+            'picture',
+            'type',
+            'seasons',
+            'updated_at',
+        )
+
+    def get_seasons(self, manifest: EpisodeManifest) -> dict:
+        return manifest.expand()
+
+
+class PicturePopularitySerializer(serializers.ModelSerializer):
+    """Serializer for picture.PicturePopularity model"""
+    picture = serializers.SlugRelatedField(read_only=True, slug_field="name")
+    type = serializers.CharField(source="picture.type", read_only=True)
+
+    class Meta:
+        model = PicturePopularity
+        fields = (
+            'picture',
+            'type',
+            'watchers',
+            'active_watchers',
         )
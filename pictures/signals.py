@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from pictures.models import PicturePopularity, Status
+
+
+@receiver(pre_save, sender=Status)
+def activate_new_status(sender, instance: Status, **kwargs):
+    """New status is counted as active watcher right away"""
+    if instance._state.adding:
+        instance.counted_active = True
+
+
+@receiver(post_save, sender=Status)
+def count_status_watcher(sender, instance: Status, created: bool, update_fields=None, **kwargs):
+    if created:
+        PicturePopularity.increment(instance.picture_id, watchers=1, active_watchers=1)
+        return
+    if update_fields is not None and "updated_at" not in update_fields:
+        return
+    # Status expired by refresh_popularity is counted again once, even if saved concurrently
+    if Status.objects.filter(pk=instance.pk, counted_active=False).update(counted_active=True):
+        instance.counted_active = True
+        PicturePopularity.increment(instance.picture_id, active_watchers=1)
+
+
+@receiver(post_delete, sender=Status)
+def uncount_status_watcher(sender, instance: Status, **kwargs):
+    # Counters are missing only if they are deleted along with picture, which is being deleted too
+    PicturePopularity.increment(
+        instance.picture_id, watchers=-1, active_watchers=-int(instance.counted_active), create=False,
+    )
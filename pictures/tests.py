@@ -1,8 +1,41 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from datetime import timedelta
+
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse_lazy
 from rest_framework import status
 
 from core.tests import BaseAuthorizedTestCase
-from pictures.models import Picture, Link
+from pictures.catalog import export_catalog
+from pictures.exceptions import SourceUnavailable
+from pictures.liveness import LinkChecker
+from pictures.loadtest import LoadRunner, YandexStubServer, dump_results, percentile
+from pictures.management.commands.process_scrape_queue import Command as ProcessScrapeQueueCommand
+from pictures import types
+from pictures.models import (EpisodeManifest, Link, Picture, PicturePopularity, ScrapeRequest,
+                             ScrapeTask, Status)
+from pictures.parsers import registry
+from pictures.prefetch import EpisodePrefetcher, prefetcher
+from pictures.scraping import scrape_episodes, search_misses
+from pictures.utils import BaseParser, YandexParser
+from pictures.workers import ScrapeWorker
 
 FILM_NAME = "Test film"
 SERIES_NAME = "Test series"
@@ -48,6 +81,7 @@ class BasePictureTestCase(BaseAuthorizedTestCase):
             )
 
 
+@override_settings(EPISODE_PREFETCH={"enabled": False})
 class ListSeriesTestCase(BasePictureTestCase, BasePictureTestSuite):
     success_url = reverse_lazy("pictures:series_list", kwargs={"name": SERIES_NAME, "episode": 1, "season": 1})
     wrong_url = reverse_lazy("pictures:series_list", kwargs={"name": FILM_NAME, "episode": 1, "season": 1})
@@ -58,3 +92,723 @@ class ListFilmsTestCase(BasePictureTestCase, BasePictureTestSuite):
     success_url = reverse_lazy("pictures:film_list", kwargs={"name": FILM_NAME})
     wrong_url = reverse_lazy("pictures:film_list", kwargs={"name": SERIES_NAME})
     right_name = FILM_NAME
+
+
+class LinkLivenessTestCase(BasePictureTestCase):
+    url = reverse_lazy("pictures:film_list", kwargs={"name": FILM_NAME})
+
+    def test_dead_links_listed_last(self):
+        dead = Link.objects.filter(picture=self.film).first()
+        Link.objects.filter(pk=dead.pk).update(is_dead=True)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertFalse(results[0]["is_dead"])
+        self.assertTrue(results[-1]["is_dead"])
+
+    def test_dead_links_hidden(self):
+        Link.objects.filter(picture=self.film).update(is_dead=True)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"hide_dead": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 0)
+
+    def test_checker_marks_links(self):
+        Link.objects.create(source="http://dead.url", picture=self.film)
+        responses = {"http://mock.url": mock.Mock(status_code=200), "http://dead.url": mock.Mock(status_code=404)}
+        checker = LinkChecker(concurrency=2, chunk_size=3, failure_threshold=1)
+        with mock.patch.object(checker.session, "head", side_effect=lambda url, **kwargs: responses[url]):
+            totals = checker.run()
+        self.assertEqual(totals, {"alive": 20, "dead": 1})
+        self.assertFalse(Link.objects.filter(checked_at__isnull=True).exists())
+        self.assertEqual(Link.objects.get(is_dead=True).status_code, 404)
+
+    def test_link_dies_after_consecutive_failures(self):
+        checker = LinkChecker(concurrency=2, failure_threshold=2)
+        queryset = Link.objects.filter(picture=self.film)
+        with mock.patch.object(checker.session, "head", side_effect=requests.ConnectionError):
+            self.assertEqual(checker.run(queryset), {"alive": 10, "dead": 0})
+        with mock.patch.object(checker.session, "head", return_value=mock.Mock(status_code=200)):
+            checker.run(queryset)
+        self.assertFalse(queryset.exclude(failures=0).exists())
+        with mock.patch.object(checker.session, "head", side_effect=requests.ConnectionError):
+            checker.run(queryset)
+            self.assertEqual(checker.run(queryset), {"alive": 0, "dead": 10})
+        self.assertEqual(ScrapeRequest.objects.get().picture_name, FILM_NAME)
+
+    @override_settings(PICTURE_PARSERS={"dummy": {"class": "pictures.tests.DummyParser"}})
+    def test_dead_episodes_are_requeued(self):
+        Link.objects.create(source="http://dead.url", season=1, episode=2, picture=self.series)
+        checker = LinkChecker(concurrency=2, failure_threshold=1)
+        with mock.patch.object(checker.session, "head", return_value=mock.Mock(status_code=404)):
+            checker.run(Link.objects.filter(source="http://dead.url"))
+        task = ScrapeTask.objects.get()
+        self.assertEqual((task.picture, task.source, task.season, task.episode), (self.series, "dummy", 1, 2))
+        self.assertFalse(ScrapeRequest.objects.exists())
+
+
+class LoadTestToolsTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = YandexStubServer(seasons=2, episodes=3)
+        cls.stub.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        super().tearDownClass()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0)
+
+    def test_stub_serves_films(self):
+        with override_settings(YANDEX_VIDEO_URL=self.stub.base_url):
+            sources = YandexParser().get_sources("some_film")
+        self.assertEqual(len(sources), 1)
+        self.assertEqual(sources[0].type, Picture.FILM)
+
+    def test_stub_serves_series(self):
+        with override_settings(YANDEX_VIDEO_URL=self.stub.base_url):
+            sources = YandexParser().get_sources("some_series")
+        self.assertEqual(len(sources), 6)
+        self.assertEqual({(source.season, source.episode) for source in sources},
+                         {(season, episode) for season in (1, 2) for episode in (1, 2, 3)})
+
+    def run_load(self, **kwargs) -> dict:
+        runner = LoadRunner(
+            base_url=self.stub.base_url,
+            tokens=["token"],
+            paths={"search": lambda random: f"search?text=film_{random.randint(1, 10)}"},
+            mix={"search": 1},
+            rate=40,
+            duration=0.25,
+            seed=1,
+            **kwargs
+        )
+        return runner.report(runner.run())
+
+    def test_load_runner_reports_results(self):
+        report = self.run_load()
+        self.assertEqual(report["search"]["requests"], 10)
+        self.assertEqual(report["search"]["errors"], 0)
+        self.assertLessEqual(report["search"]["p50"], report["search"]["p99"])
+        with tempfile.NamedTemporaryFile("w+") as results:
+            dump_results(results.name, {"rate": 40}, report)
+            dumped = json.load(results)
+        self.assertEqual(dumped["config"], {"rate": 40})
+        self.assertEqual(dumped["results"]["search"]["requests"], 10)
+
+    def test_load_runner_counts_timeouts(self):
+        self.stub.delay = 0.5
+        try:
+            report = self.run_load(timeout=0.1)
+        finally:
+            self.stub.delay = 0
+        self.assertEqual(report["search"]["errors"], 10)
+        self.assertEqual(report["search"]["timeouts"], 10)
+
+
+class DummyParser(BaseParser):
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def get_sources(self, name):
+        return [types.Picture(name=name, source_url="http://dummy.url", type=Picture.FILM, season=1, episode=1)]
+
+    def get_episode_sources(self, name, season, episode):
+        if episode > 3:
+            return []
+        return [types.Picture(name=name, source_url=f"http://dummy.url/{season}/{episode}",
+                              type=Picture.SERIES, season=season, episode=episode)]
+
+
+class ParserRegistryTestCase(TestCase):
+
+    @override_settings(PICTURE_PARSERS={
+        "dummy": {"class": "pictures.tests.DummyParser", "options": {"timeout": 3}},
+        "disabled": {"class": "pictures.tests.DummyParser", "enabled": False},
+    })
+    def test_loads_enabled_parsers_with_options(self):
+        parsers = registry.get_parsers()
+        self.assertEqual(len(parsers), 1)
+        self.assertIsInstance(parsers[0], DummyParser)
+        self.assertEqual(parsers[0].timeout, 3)
+        self.assertIs(registry.get_parsers()[0], parsers[0])
+
+    def test_views_dont_import_scraping_dependencies(self):
+        code = "import django, sys; django.setup(); import pictures.views; sys.exit('bs4' in sys.modules)"
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+
+class EpisodeManifestTestCase(BasePictureTestCase):
+    url = reverse_lazy("pictures:manifest", kwargs={"name": SERIES_NAME})
+
+    def setUp(self):
+        super().setUp()
+        Link.objects.create(source="http://mock.url/2/1", season=2, episode=1, picture=self.series)
+        Link.objects.create(source="http://mock.url/2/2", season=2, episode=2, picture=self.series, is_dead=True)
+
+    def test_rebuild_strips_common_prefix(self):
+        manifest = EpisodeManifest.rebuild(self.series)
+        self.assertEqual(manifest.prefix, "http://mock.url")
+        self.assertEqual(manifest.seasons["2"], {"1": ["/2/1"]})
+        self.assertEqual(manifest.get_sources(2, 1), ["http://mock.url/2/1"])
+        self.assertEqual(len(manifest.get_sources(1, 1)), 10)
+        self.assertEqual(manifest.get_sources(2, 2), [])
+
+    def test_get_manifest(self):
+        EpisodeManifest.rebuild(self.series)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["picture"], SERIES_NAME)
+        self.assertEqual(data["seasons"]["2"], {"1": ["http://mock.url/2/1"]})
+
+    def test_get_missing_manifest(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_checker_rebuilds_manifest(self):
+        EpisodeManifest.rebuild(self.series)
+        checker = LinkChecker(concurrency=2)
+        with mock.patch.object(checker.session, "head", return_value=mock.Mock(status_code=200)):
+            checker.run(Link.objects.filter(picture=self.series))
+        manifest = EpisodeManifest.objects.get(picture=self.series)
+        self.assertEqual(manifest.get_sources(2, 2), ["http://mock.url/2/2"])
+
+
+class CatalogExportTestCase(BasePictureTestCase):
+    url = reverse_lazy("pictures:catalog_export")
+
+    def test_export_requires_admin(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_streams_catalog(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(len(records), 22)
+        self.assertEqual([record["model"] for record in records[:2]], ["pictures.picture"] * 2)
+        self.assertEqual(records[-1]["model"], "pictures.link")
+
+    def test_export_import_round_trip(self):
+        with tempfile.NamedTemporaryFile("w+") as catalog:
+            call_command("export_catalog", catalog.name)
+            Picture.objects.filter(pk=self.film.pk).delete()
+            call_command("import_catalog", catalog.name, batch_size=7, stdout=StringIO())
+            call_command("import_catalog", catalog.name, stdout=StringIO())
+        self.assertEqual(Link.objects.filter(picture__name=FILM_NAME).count(), 1)
+        self.assertEqual(Link.objects.filter(picture=self.series).count(), 10)
+        self.assertEqual(Picture.objects.count(), 2)
+
+    def test_import_remaps_conflicting_pictures(self):
+        Link.objects.filter(picture=self.film).update(source="http://film.url")
+        with tempfile.NamedTemporaryFile("w+") as catalog:
+            call_command("export_catalog", catalog.name)
+            Picture.objects.all().delete()
+            other = Picture.objects.create(pk=self.film.pk, name="Other film")
+            call_command("import_catalog", catalog.name, stdout=StringIO())
+        self.assertFalse(other.link_set.exists())
+        film = Picture.objects.get(name=FILM_NAME, type=Picture.FILM)
+        self.assertNotEqual(film.pk, other.pk)
+        self.assertEqual(set(film.link_set.values_list("source", flat=True)), {"http://film.url"})
+        self.assertEqual(film.manifest.get_sources(1, 1), ["http://film.url"])
+
+    def test_import_rejects_incomplete_records(self):
+        with tempfile.NamedTemporaryFile("w+") as catalog:
+            catalog.write('{"model": "pictures.picture", "pk": 1, "type": "F"}\n')
+            catalog.flush()
+            with self.assertRaisesMessage(CommandError, "misses field 'name'"):
+                call_command("import_catalog", catalog.name, stdout=StringIO())
+
+
+class CatalogExportSnapshotTestCase(TransactionTestCase):
+
+    def test_export_reads_single_snapshot(self):
+        film = Picture.objects.create(name=FILM_NAME)
+        Link.objects.create(source="http://mock.url", picture=film)
+        lines = export_catalog()
+        next(lines)
+
+        def create_series():
+            series = Picture.objects.create(name=SERIES_NAME, type=Picture.SERIES)
+            Link.objects.create(source="http://mock.url/1/1", picture=series)
+            connection.close()
+
+        thread = threading.Thread(target=create_series)
+        thread.start()
+        thread.join()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record["model"] for record in records], ["pictures.link"])
+        self.assertEqual(Picture.objects.count(), 2)
+
+
+class PicturePopularityTestCase(BasePictureTestCase):
+    url = reverse_lazy("pictures:trending")
+
+    def setUp(self):
+        super().setUp()
+        self.other_user = User.objects.create(username="other-user")
+        Status.objects.create(user=self.user, picture=self.film)
+        Status.objects.create(user=self.user, picture=self.series)
+        Status.objects.create(user=self.other_user, picture=self.series)
+
+    def test_counters_follow_statuses(self):
+        self.assertEqual(self.series.popularity.watchers, 2)
+        self.assertEqual(self.series.popularity.active_watchers, 2)
+        Status.objects.filter(user=self.other_user).delete()
+        Status.objects.get(user=self.user, picture=self.series).delete()
+        self.series.popularity.refresh_from_db()
+        self.assertEqual(self.series.popularity.watchers, 0)
+        self.assertEqual(self.series.popularity.active_watchers, 0)
+
+    def test_watched_picture_is_deleted(self):
+        self.series.delete()
+        self.assertFalse(Picture.objects.filter(pk=self.series.pk).exists())
+        self.assertFalse(PicturePopularity.objects.filter(picture_id=self.series.pk).exists())
+        self.assertEqual(Status.objects.count(), 1)
+
+    def test_stale_status_becomes_active_on_update(self):
+        status_ = Status.objects.get(user=self.user, picture=self.film)
+        stale = PicturePopularity.active_since() - timedelta(days=1)
+        Status.objects.filter(pk=status_.pk).update(updated_at=stale)
+        call_command("refresh_popularity", stdout=StringIO())
+        self.film.popularity.refresh_from_db()
+        self.assertEqual((self.film.popularity.watchers, self.film.popularity.active_watchers), (1, 0))
+        status_.refresh_from_db()
+        status_.episode = 2
+        status_.save()
+        self.film.popularity.refresh_from_db()
+        self.assertEqual((self.film.popularity.watchers, self.film.popularity.active_watchers), (1, 1))
+
+    def test_stale_status_is_counted_once(self):
+        status_ = Status.objects.get(user=self.user, picture=self.film)
+        stale = PicturePopularity.active_since() - timedelta(days=1)
+        Status.objects.filter(pk=status_.pk).update(updated_at=stale)
+        status_.refresh_from_db()
+        status_.save()
+        self.film.popularity.refresh_from_db()
+        self.assertEqual((self.film.popularity.watchers, self.film.popularity.active_watchers), (1, 1))
+        status_.delete()
+        self.film.popularity.refresh_from_db()
+        self.assertEqual((self.film.popularity.watchers, self.film.popularity.active_watchers), (0, 0))
+
+    def test_trending(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual([result["picture"] for result in results], [SERIES_NAME, FILM_NAME])
+        self.assertEqual(results[0]["active_watchers"], 2)
+
+
+@override_settings(
+    PICTURE_PARSERS={"dummy": {"class": "pictures.tests.DummyParser"}},
+    SCRAPE_THROTTLE_RATES={"user": "1/min", "global": "10/min"},
+)
+class ScrapeThrottleTestCase(BasePictureTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def search(self, name):
+        return self.client.get(reverse_lazy("pictures:picture_search", kwargs={"picture_name": name}))
+
+    def test_excess_scrapes_are_queued(self):
+        self.assertEqual(self.search("first").status_code, status.HTTP_302_FOUND)
+        response = self.search("second")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(self.search("second").status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(ScrapeRequest.objects.get(picture_name="second").priority, 2)
+
+    @override_settings(SCRAPE_THROTTLE_RATES={"user": "2/min", "global": "1/min"})
+    def test_user_tokens_are_refunded_when_global_limit_is_hit(self):
+        self.assertEqual(self.search("first").status_code, status.HTTP_302_FOUND)
+        self.assertEqual(self.search("second").status_code, status.HTTP_202_ACCEPTED)
+        tokens, _ = cache.get(f"scrape_throttle_user_{self.user.pk}")
+        self.assertAlmostEqual(tokens, 1, places=2)
+
+    def test_existing_links_are_not_throttled(self):
+        for _ in range(3):
+            response = self.search(FILM_NAME)
+            self.assertRedirects(response, reverse_lazy("pictures:film_list", kwargs={"name": FILM_NAME}),
+                                 fetch_redirect_response=False)
+        self.assertEqual(self.search("first").status_code, status.HTTP_302_FOUND)
+
+    def test_queue_processing(self):
+        ScrapeRequest.enqueue("queued")
+        call_command("process_scrape_queue", once=True)
+        self.assertFalse(ScrapeRequest.objects.exists())
+        self.assertTrue(Link.objects.filter(picture__name="queued").exists())
+
+    def test_empty_queue_keeps_tokens(self):
+        call_command("process_scrape_queue", once=True)
+        self.assertIsNone(cache.get("scrape_throttle_global"))
+
+    def test_leased_search_is_released_after_failure(self):
+        ScrapeRequest.enqueue("queued")
+        command = ProcessScrapeQueueCommand(stderr=StringIO())
+        scrape_request = command.claim(lease_seconds=60)
+        self.assertIsNone(command.claim(lease_seconds=60))
+        scrape_picture = "pictures.management.commands.process_scrape_queue.scrape_picture"
+        with mock.patch(scrape_picture, side_effect=SourceUnavailable):
+            command.process(scrape_request, max_attempts=3, retry_delay=60)
+        released = ScrapeRequest.objects.get()
+        self.assertEqual(released.attempts, 1)
+        self.assertGreater(released.leased_until, timezone.now() + timedelta(seconds=50))
+        self.assertIsNone(command.claim(lease_seconds=60))
+        ScrapeRequest.objects.update(leased_until=timezone.now())
+        self.assertEqual(command.claim(lease_seconds=60).pk, released.pk)
+
+    def test_failed_search_is_not_retried_at_once(self):
+        ScrapeRequest.enqueue("queued")
+        scrape_picture = "pictures.management.commands.process_scrape_queue.scrape_picture"
+        with mock.patch(scrape_picture, side_effect=SourceUnavailable) as scrape:
+            call_command("process_scrape_queue", once=True, stderr=StringIO())
+        self.assertEqual(scrape.call_count, 1)
+        self.assertEqual(ScrapeRequest.objects.get().attempts, 1)
+
+
+class EmptyParser(BaseParser):
+    calls = 0
+
+    def get_sources(self, name):
+        EmptyParser.calls += 1
+        return []
+
+
+@override_settings(PICTURE_PARSERS={"empty": {"class": "pictures.tests.EmptyParser"}}, SEARCH_MISS_TTL=60)
+class SearchMissTestCase(BaseAuthorizedTestCase):
+    url = reverse_lazy("pictures:picture_search", kwargs={"picture_name": "typo"})
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        EmptyParser.calls = 0
+        self.client.force_login(self.user)
+
+    def test_missing_picture_is_remembered(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(EmptyParser.calls, 1)
+        self.assertTrue(search_misses.is_missing("typo"))
+
+    def test_queued_search_misses_are_remembered(self):
+        ScrapeRequest.enqueue("typo")
+        ScrapeRequest.enqueue("outage")
+
+        def get_sources(name):
+            if name == "outage":
+                raise SourceUnavailable()
+            return []
+
+        with mock.patch.object(EmptyParser, "get_sources", side_effect=get_sources):
+            call_command("process_scrape_queue", once=True, max_attempts=1, stderr=StringIO())
+        self.assertTrue(search_misses.is_missing("typo"))
+        self.assertTrue(search_misses.is_failing("outage"))
+
+    def test_misses_backoff(self):
+        search_misses.remember("typo")
+        search_misses.remember("typo")
+        entry = cache.get(search_misses.get_cache_key("typo"))
+        self.assertEqual(entry["misses"], 2)
+        with mock.patch("pictures.scraping.time.time", return_value=entry["until"] - 61):
+            self.assertTrue(search_misses.is_missing("typo"))
+        with mock.patch("pictures.scraping.time.time", return_value=entry["until"] + 1):
+            self.assertFalse(search_misses.is_missing("typo"))
+
+    def test_failed_search_is_retried_soon(self):
+        with mock.patch.object(EmptyParser, "get_sources", side_effect=SourceUnavailable) as get_sources:
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(get_sources.call_count, 1)
+        self.assertFalse(search_misses.is_missing("typo"))
+        cache.delete(search_misses.get_failure_cache_key("typo"))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(EmptyParser.calls, 1)
+
+    def test_yandex_parser_episode_page_errors(self):
+        response = mock.Mock(text="<html></html>")
+        response.raise_for_status.side_effect = requests.HTTPError("429 Client Error")
+        with mock.patch("pictures.utils.requests.get", return_value=response):
+            with self.assertRaises(SourceUnavailable):
+                YandexParser().get_episode_sources("typo", 1, 1)
+            with self.assertRaises(requests.HTTPError):
+                YandexParser()._get_season_episodes("typo", 1)
+
+    def test_yandex_parser_without_iframe(self):
+        with mock.patch("pictures.utils.requests.get", return_value=mock.Mock(text="<html></html>")):
+            self.assertEqual(YandexParser().get_sources("typo"), [])
+
+
+@override_settings(
+    PICTURE_PARSERS={"dummy": {"class": "pictures.tests.DummyParser"}},
+    EPISODE_PREFETCH={"enabled": True, "count": 2, "workers": 1, "per_title": 1},
+)
+class EpisodePrefetchTestCase(BasePictureTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def create_links(self, episodes, is_dead=True):
+        for season, episode in episodes:
+            Link.objects.create(source=f"http://mock.url/{season}/{episode}", season=season, episode=episode,
+                                picture=self.series, is_dead=is_dead)
+
+    def test_warm_scrapes_missing_upcoming_episodes(self):
+        self.create_links([(1, 2)], is_dead=False)
+        self.create_links([(1, 3), (2, 1)])
+        links = prefetcher.warm(SERIES_NAME, 1, 1)
+        self.assertEqual({(link.season, link.episode) for link in links}, {(1, 3), (2, 1)})
+        manifest = EpisodeManifest.objects.get(picture=self.series)
+        self.assertEqual(manifest.get_sources(2, 1), ["http://dummy.url/2/1"])
+        self.assertEqual(prefetcher.warm(SERIES_NAME, 1, 1), [])
+
+    @override_settings(SCRAPE_THROTTLE_RATES={"user": "10/min", "global": "1/min"})
+    def test_warm_is_limited_to_known_episodes_and_global_rate(self):
+        self.create_links([(1, 2), (1, 3)])
+        links = prefetcher.warm(SERIES_NAME, 1, 1)
+        self.assertEqual([(link.season, link.episode) for link in links], [(1, 2)])
+        self.assertEqual(prefetcher.warm(SERIES_NAME, 1, 1), [])
+        self.assertFalse(Link.objects.filter(picture=self.series, season=2).exists())
+
+    def test_parsers_are_not_loaded_without_episodes_to_warm(self):
+        with mock.patch.object(registry, "get_parsers") as get_parsers:
+            self.assertEqual(prefetcher.warm(SERIES_NAME, 1, 1), [])
+            self.create_links([(1, 2)])
+            search_misses.remember(f"{SERIES_NAME}/1/2")
+            self.assertEqual(prefetcher.warm(SERIES_NAME, 1, 1), [])
+            self.assertEqual(scrape_episodes(self.series, [(1, 2)]), [])
+        get_parsers.assert_not_called()
+
+    def test_missing_episodes_are_not_searched_again(self):
+        self.create_links([(1, 4), (1, 5), (2, 1)])
+        prefetcher.warm(SERIES_NAME, 1, 3)
+        with mock.patch.object(DummyParser, "get_episode_sources") as get_episode_sources:
+            prefetcher.warm(SERIES_NAME, 1, 3)
+        get_episode_sources.assert_not_called()
+
+    def test_schedule_is_limited_per_title(self):
+        with mock.patch.object(prefetcher, "_executor") as executor:
+            self.assertTrue(prefetcher.schedule(SERIES_NAME, 1, 1))
+            self.assertFalse(prefetcher.schedule(SERIES_NAME, 1, 2))
+            # Slots are shared, so other process is limited too
+            self.assertFalse(EpisodePrefetcher().schedule(SERIES_NAME, 1, 2))
+            self.assertTrue(prefetcher.schedule(FILM_NAME, 1, 1))
+        self.assertEqual(executor.submit.call_count, 2)
+        prefetcher._release(executor.submit.call_args_list[0][0][1])
+        self.assertIsNotNone(prefetcher._acquire(SERIES_NAME))
+
+
+@override_settings(PICTURE_PARSERS={"dummy": {"class": "pictures.tests.DummyParser", "max_tasks": 2}})
+class ScrapeWorkerTestCase(BasePictureTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        ScrapeTask.enqueue(self.series, "dummy", [(1, episode) for episode in range(1, 6)])
+        self.first_worker = ScrapeWorker("first", lease_seconds=60)
+        self.second_worker = ScrapeWorker("second", lease_seconds=60)
+
+    def test_max_tasks_hold_across_workers(self):
+        self.assertEqual(len(self.first_worker.claim("dummy", 5)), 2)
+        self.assertEqual(self.second_worker.claim("dummy", 5), [])
+
+    def test_expired_leases_are_reclaimed(self):
+        tasks = self.first_worker.claim("dummy", 5)
+        ScrapeTask.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        reclaimed = self.second_worker.claim("dummy", 5)
+        self.assertEqual({task.pk for task in reclaimed}, {task.pk for task in tasks})
+        self.first_worker.finish(tasks[0])
+        self.assertEqual(ScrapeTask.objects.get(pk=tasks[0].pk).leased_by, "second")
+
+    def test_exhausted_expired_tasks_are_failed(self):
+        worker = ScrapeWorker("third", max_attempts=1)
+        task = worker.claim("dummy", 1)[0]
+        ScrapeTask.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn(task.pk, {claimed.pk for claimed in worker.claim("dummy", 5)})
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.leased_by), (ScrapeTask.FAILED, ""))
+
+    def test_heartbeat_prolongs_leases(self):
+        task = self.first_worker.claim("dummy", 1)[0]
+        self.first_worker._active[task.pk] = task
+        ScrapeTask.objects.update(lease_expires_at=timezone.now())
+        self.assertEqual(self.first_worker.heartbeat(), 1)
+        self.assertGreater(ScrapeTask.objects.get(pk=task.pk).lease_expires_at, timezone.now())
+
+    def test_execute_scrapes_episode(self):
+        for task in self.first_worker.claim("dummy", 2):
+            self.first_worker.execute(task)
+        self.assertEqual(ScrapeTask.objects.filter(status=ScrapeTask.DONE).count(), 2)
+        self.assertTrue(Link.objects.filter(picture=self.series, season=1, episode=2).exists())
+        self.assertEqual(ScrapeTask.enqueue(self.series, "dummy", [(1, 1), (1, 2), (1, 6)]), 3)
+
+    def test_unavailable_source_is_retried(self):
+        search_misses.remember(f"{SERIES_NAME}/1/1")
+        task = self.first_worker.claim("dummy", 1)[0]
+        with mock.patch.object(DummyParser, "get_episode_sources", side_effect=SourceUnavailable):
+            self.first_worker.execute(task)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (ScrapeTask.PENDING, 1))
+        self.assertIn("SourceUnavailable", task.error)
+        self.assertEqual(cache.get(search_misses.get_cache_key(f"{SERIES_NAME}/1/1"))["misses"], 1)
+        self.second_worker.execute(self.second_worker.claim("dummy", 1)[0])
+        self.assertEqual(ScrapeTask.objects.get(pk=task.pk).status, ScrapeTask.DONE)
+        self.assertTrue(Link.objects.filter(picture=self.series, source="http://dummy.url/1/1").exists())
+
+    def test_repeated_tasks_dont_duplicate_links(self):
+        Link.objects.create(source="http://dummy.url/1/2", season=1, episode=2, picture=self.series,
+                            is_dead=True)
+        task = self.first_worker.claim("dummy", 2)[1]
+        self.first_worker.execute(task)
+        ScrapeTask.enqueue(self.series, "dummy", [(1, 2)])
+        self.second_worker.execute(self.second_worker.claim("dummy", 1)[0])
+        links = Link.objects.filter(picture=self.series, season=1, episode=2)
+        self.assertEqual(list(links.values_list("source", "is_dead")), [("http://dummy.url/1/2", False)])
+
+
+class ScrapeTaskEnqueueTestCase(TransactionTestCase):
+
+    def test_concurrent_enqueues(self):
+        picture = Picture.objects.create(name=SERIES_NAME, type=Picture.SERIES)
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def enqueue():
+            try:
+                barrier.wait()
+                ScrapeTask.enqueue(picture, "dummy", [(1, episode) for episode in range(1, 21)])
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enqueue) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(ScrapeTask.objects.count(), 20)
+
+
+@override_settings(EPISODE_PREFETCH={"enabled": False})
+class HotPathQueriesTestCase(BasePictureTestCase):
+    """Guards count of database queries made by frequently requested views,
+    it mustn't depend on count of listed links
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_series_list_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(ListSeriesTestCase.success_url)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    def test_film_list_queries(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(ListFilmsTestCase.success_url)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    def test_picture_search_cache_hit_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse_lazy("pictures:picture_search", kwargs={"picture_name": FILM_NAME}))
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+
+BENCHMARK_BASELINES = Path(__file__).resolve().parent / "benchmark_baselines.json"
+
+
+@skipUnless(os.getenv("BENCHMARK"), "Set BENCHMARK=1 to run benchmarks or BENCHMARK=update to store baselines")
+@override_settings(EPISODE_PREFETCH={"enabled": False})
+class HotPathBenchmarkTestCase(BaseAuthorizedTestCase):
+    """Compares median latency of frequently requested views over large catalog
+    with baselines stored in benchmark_baselines.json
+
+    Fails when view is slower than baseline by more than BENCHMARK_THRESHOLD
+    (0.5 by default). Baselines depend on machine, update them on the machine
+    running benchmarks with BENCHMARK=update.
+    """
+    catalog_size = 2000
+    episodes = 10
+    repeats = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        pictures = Picture.objects.bulk_create(
+            Picture(name=f"benchmark_{picture_type}_{number}", type=picture_type)
+            for number in range(cls.catalog_size) for picture_type in (Picture.FILM, Picture.SERIES)
+        )
+        links = []
+        for picture in pictures:
+            if picture.type == Picture.FILM:
+                links.append(Link(source=f"http://mock.url/{picture.name}", picture=picture))
+            else:
+                links.extend(
+                    Link(source=f"http://mock.url/{picture.name}/{season}/{episode}",
+                         season=season, episode=episode, picture=picture)
+                    for season in (1, 2) for episode in range(1, cls.episodes + 1)
+                )
+        Link.objects.bulk_create(links, batch_size=5000)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def measure(self, url) -> float:
+        """Returns median latency of url in milliseconds"""
+        self.client.get(url)
+        latencies = []
+        for _ in range(self.repeats):
+            started = time.perf_counter()
+            self.client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.median(latencies)
+
+    def assertNotRegressed(self, name, url):
+        latency = self.measure(url)
+        baselines = json.loads(BENCHMARK_BASELINES.read_text()) if BENCHMARK_BASELINES.exists() else {}
+        if os.getenv("BENCHMARK") == "update":
+            baselines[name] = round(latency, 3)
+            BENCHMARK_BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+            return
+        self.assertIn(name, baselines, "No baseline stored, run with BENCHMARK=update")
+        limit = baselines[name] * (1 + float(os.getenv("BENCHMARK_THRESHOLD", 0.5)))
+        self.assertLessEqual(latency, limit, f"{name} median latency {latency:.3f}ms exceeds {limit:.3f}ms")
+
+    def test_series_list(self):
+        name = f"benchmark_{Picture.SERIES}_{self.catalog_size // 2}"
+        self.assertNotRegressed("series_list", reverse_lazy(
+            "pictures:series_list", kwargs={"name": name, "season": 2, "episode": self.episodes},
+        ))
+
+    def test_film_list(self):
+        name = f"benchmark_{Picture.FILM}_{self.catalog_size // 2}"
+        self.assertNotRegressed("film_list", reverse_lazy("pictures:film_list", kwargs={"name": name}))
+
+    def test_picture_search_cache_hit(self):
+        name = f"benchmark_{Picture.SERIES}_{self.catalog_size - 1}"
+        url = reverse_lazy("pictures:picture_search", kwargs={"picture_name": name})
+        self.assertNotRegressed("picture_search", url)
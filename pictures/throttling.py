@@ -0,0 +1,119 @@
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate: Optional[str]) -> Tuple[Optional[int], Optional[float]]:
+    """Parses rate in DRF format (e.g. "10/min") into bucket capacity and
+    tokens refilled per second
+    """
+    if rate is None:
+        return None, None
+    num, period = rate.split("/")
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class TokenBucket:
+    """Token bucket stored in shared cache, so limits hold across processes
+
+    Bucket state is read and written under short lock built on atomic
+    cache.add. If lock can't be acquired in time, the request is let through
+    rather than blocked by a stuck lock.
+    """
+    lock_timeout = 1
+
+    def __init__(self, key: str, capacity: int, rate: float):
+        self.key = key
+        self.lock_key = f"{key}_lock"
+        self.capacity = capacity
+        self.rate = rate
+
+    def _acquire(self) -> bool:
+        deadline = time.monotonic() + self.lock_timeout
+        while not cache.add(self.lock_key, True, self.lock_timeout):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def _get_tokens(self, now: float) -> float:
+        tokens, updated_at = cache.get(self.key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def _set_tokens(self, tokens: float, now: float):
+        cache.set(self.key, (tokens, now), self.capacity / self.rate + self.lock_timeout)
+
+    def consume(self) -> float:
+        """Takes single token, returns 0 on success or seconds to wait until token is available"""
+        if not self._acquire():
+            return 0
+        try:
+            now = time.time()
+            tokens = self._get_tokens(now)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._set_tokens(tokens, now)
+            return wait
+        finally:
+            cache.delete(self.lock_key)
+
+    def refund(self):
+        """Returns token taken by consume, e.g. when request was rejected by other bucket"""
+        if not self._acquire():
+            return
+        try:
+            now = time.time()
+            self._set_tokens(min(self.capacity, self._get_tokens(now) + 1), now)
+        finally:
+            cache.delete(self.lock_key)
+
+
+class ScrapeThrottle(BaseThrottle):
+    """Throttles requests triggering outbound scraping with rate from
+    settings.SCRAPE_THROTTLE_RATES[scope]
+    """
+    scope: str
+
+    def __init__(self):
+        self.capacity, self.rate = parse_rate(settings.SCRAPE_THROTTLE_RATES.get(self.scope))
+        self._wait = None
+
+    def get_cache_key(self, request) -> str:
+        raise NotImplementedError("Implement in subclass")
+
+    def allow_request(self, request, view) -> bool:
+        if self.rate is None:
+            return True
+        self._wait = TokenBucket(self.get_cache_key(request), self.capacity, self.rate).consume()
+        return not self._wait
+
+    def refund(self, request):
+        """Returns token taken by allowed request"""
+        if self.rate is not None:
+            TokenBucket(self.get_cache_key(request), self.capacity, self.rate).refund()
+
+    def wait(self) -> Optional[float]:
+        return self._wait
+
+
+class UserScrapeThrottle(ScrapeThrottle):
+    scope = "user"
+
+    def get_cache_key(self, request) -> str:
+        return f"scrape_throttle_user_{request.user.pk}"
+
+
+class GlobalScrapeThrottle(ScrapeThrottle):
+    scope = "global"
+
+    def get_cache_key(self, request) -> str:
+        return "scrape_throttle_global"
@@ -15,9 +15,24 @@ urlpatterns = [
         views.FilmListView.as_view(),
         name="film_list",
     ),
+    path(
+        'manifest/<str:name>/',
+        views.EpisodeManifestView.as_view(),
+        name="manifest",
+    ),
+    path(
+        'trending/',
+        views.TrendingListView.as_view(),
+        name="trending",
+    ),
     path(
         'search/<str:picture_name>/',
         views.PictureSearchView.as_view(),
         name="picture_search",
     ),
-]
\ No newline at end of file
+    path(
+        'export/',
+        views.CatalogExportView.as_view(),
+        name="catalog_export",
+    ),
+]
@@ -1,30 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from urllib.parse import urljoin
 
 import requests
 from bs4 import BeautifulSoup
+from django.conf import settings
 
 from pictures import models
+from pictures.exceptions import SourceUnavailable
 from pictures.types import Picture
 
 
 class BaseParser:
     def get_sources(self, name: str) -> List[Picture]:
         """Returns source attribute for i-frame tag for given season and episode
-        for picture with name
+        for picture with name, empty list if picture isn't found
+
+        Raises SourceUnavailable if source can't be reached
 
         Attributes:
             name -- picture name separated by underscores (e.g. "doctor_house")
         """
         raise NotImplementedError("Implement in subclass")
 
+    def get_episodes(self, name: str) -> List[Picture]:
+        """Returns all episodes of series without their sources, empty list if series
+        isn't found or parser can't list episodes
+
+        Raises SourceUnavailable if source can't be reached
+
+        Attributes:
+            name -- picture name separated by underscores (e.g. "doctor_house")
+        """
+        return []
+
+    def get_episode_sources(self, name: str, season: int, episode: int) -> List[Picture]:
+        """Returns sources of single series episode, empty list if episode isn't found
+        or parser can't parse single episodes
+
+        Raises SourceUnavailable if source can't be reached
+
+        Attributes:
+            name    -- stored picture name
+            season  -- season number
+            episode -- episode number
+        """
+        return []
+
 
 class YandexParser(BaseParser):
     # Todo: Rewrite using Scrapy
     initial_name: str
 
-    def __init__(self):
-        self.base_url = "https://yandex.ru/video/"
+    def __init__(self, base_url: Optional[str] = None, timeout: float = 10, concurrency: int = 1):
+        """Configures parser
+
+        Attributes:
+            base_url    -- Yandex.Video url, settings.YANDEX_VIDEO_URL by default
+            timeout     -- timeout of each request in seconds
+            concurrency -- count of episodes parsed simultaneously
+        """
+        self.base_url = base_url or settings.YANDEX_VIDEO_URL
+        self.timeout = timeout
+        self.concurrency = concurrency
         self.search_url = urljoin(self.base_url, "search")
         self.series_url_pattern = urljoin(
             self.base_url,
@@ -33,7 +71,40 @@ class YandexParser(BaseParser):
 
     def get_sources(self, name: str) -> List[Picture]:
         """Returns sources for picture name"""
-        page = requests.get(self.search_url, params={"text": name})
+        try:
+            return self._get_sources(name)
+        except requests.RequestException as error:
+            raise SourceUnavailable(f"Yandex.Video request failed: {error}") from error
+
+    def get_episodes(self, name: str) -> List[Picture]:
+        """Returns all episodes of series without their sources"""
+        try:
+            page = requests.get(self.search_url, params={"text": name}, timeout=self.timeout)
+            page.raise_for_status()
+            soup = BeautifulSoup(page.text, "html.parser")
+            internal_name = self._get_internal_series_name(soup)
+            if self._get_type_of_soup(soup) != models.Picture.SERIES or not internal_name:
+                return []
+            seasons_count = len(soup.select("label.carousel__item"))
+            return [
+                Picture(name=internal_name, type=models.Picture.SERIES, season=season, episode=episode)
+                for season in range(1, seasons_count + 1)
+                for episode in self._get_season_episodes(internal_name, season)
+            ]
+        except requests.RequestException as error:
+            raise SourceUnavailable(f"Yandex.Video request failed: {error}") from error
+
+    def get_episode_sources(self, name: str, season: int, episode: int) -> List[Picture]:
+        """Returns sources of single series episode"""
+        try:
+            source = self._parse_source(name, season, episode)
+        except requests.RequestException as error:
+            raise SourceUnavailable(f"Yandex.Video request failed: {error}") from error
+        return [source] if source is not None else []
+
+    def _get_sources(self, name: str) -> List[Picture]:
+        page = requests.get(self.search_url, params={"text": name}, timeout=self.timeout)
+        page.raise_for_status()
         soup = BeautifulSoup(page.text, "html.parser")
         self.initial_name = name
         if self._get_type_of_soup(soup) == models.Picture.SERIES:
@@ -54,7 +125,10 @@ class YandexParser(BaseParser):
             name         -- name of film
             initial_page -- page received from search
         """
-        source = initial_page.find("iframe").get("src")
+        iframe = initial_page.find("iframe")
+        if iframe is None or not iframe.get("src"):
+            return []
+        source = iframe.get("src")
         return [Picture(name=name, source_url=f"http:{source}", type=models.Picture.FILM, episode=1, season=1)]
 
     def _parse_series(self, initial_page: BeautifulSoup) -> List[Picture]:
@@ -66,25 +140,31 @@ class YandexParser(BaseParser):
         season_selector = "label.carousel__item"
         seasons_count = len(initial_page.select(season_selector))
         internal_name = self._get_internal_series_name(initial_page)
+        if not internal_name:
+            return []
         parsed_series = [
             episode for season in range(1, seasons_count + 1)
             for episode in self._series_parser(internal_name, season)
+            if episode is not None
         ]
         return parsed_series
 
     @staticmethod
-    def _get_internal_series_name(initial_page: BeautifulSoup) -> str:
-        """Returns internal name of picture, consumed by get yandex.video request
+    def _get_internal_series_name(initial_page: BeautifulSoup) -> Optional[str]:
+        """Returns internal name of picture, consumed by get yandex.video request,
+        None if page has no series title
 
         Attributes:
             initial_page -- Page to parse from, same as in self.parse_series method
         """
         name_selector = ".series-navigator__title-link"
-        name_tag = initial_page.select(name_selector)[0]
+        name_tag = initial_page.select_one(name_selector)
+        if name_tag is None:
+            return None
         return name_tag.get_text().strip().replace(" ", "-").lower()
 
-    def _parse_source(self, internal_name, season, episode) -> Picture:
-        """Parses source data from yandex.video
+    def _parse_source(self, internal_name, season, episode) -> Optional[Picture]:
+        """Parses source data from yandex.video, returns None if episode has no source
 
         Attributes:
             internal_name    -- internal name
@@ -92,9 +172,13 @@ class YandexParser(BaseParser):
             episode          -- episode
         """
         sources_url = self.series_url_pattern.format(film_name=internal_name, season=season, episode=episode)
-        source = requests.get(sources_url)
+        source = requests.get(sources_url, timeout=self.timeout)
+        source.raise_for_status()
         soup = BeautifulSoup(source.text, "html.parser")
-        source_url = soup.find("iframe").get("src")
+        iframe = soup.find("iframe")
+        if iframe is None or not iframe.get("src"):
+            return None
+        source_url = iframe.get("src")
         return Picture(
             name=internal_name,
             source_url=f"http:{source_url}",
@@ -106,18 +190,30 @@ class YandexParser(BaseParser):
     def _series_parser(self, internal_name, season):
         """Generator to parse all series into array
 
+        Attributes:
+            internal_name -- internal yandex.video name of picture
+            season        -- given season
+        """
+        episodes = self._get_season_episodes(internal_name, season)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            yield from executor.map(lambda episode: self._parse_source(internal_name, season, episode), episodes)
+
+    def _get_season_episodes(self, internal_name, season) -> List[int]:
+        """Returns episodes numbers of season
+
         Attributes:
             internal_name -- internal yandex.video name of picture
             season        -- given season
         """
         episode_selector = "div.radio-table__list-row > label > span"
         start_url = self.series_url_pattern.format(film_name=internal_name, season=season, episode=1)
-        start_page = requests.get(start_url)
+        start_page = requests.get(start_url, timeout=self.timeout)
+        start_page.raise_for_status()
         soup = BeautifulSoup(start_page.text, "html.parser")
+        episodes = []
         for episode_tag in soup.select(episode_selector):
             try:
-                episode = int(episode_tag.get_text())
-                yield self._parse_source(internal_name, season, episode)
+                episodes.append(int(episode_tag.get_text()))
             except ValueError:
                 break
-
+        return episodes
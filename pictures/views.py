@@ -1,19 +1,43 @@
-from rest_framework import generics, views
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import generics, status, views
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from django.http import StreamingHttpResponse
 from django.shortcuts import redirect, reverse
 
-from pictures.models import Link, Picture
-from pictures.serializers import LinkSerializer
-from pictures.utils import YandexParser
+from pictures.catalog import export_catalog
+from pictures.exceptions import PictureNotFound, SourceUnavailable
+from pictures.models import EpisodeManifest, Link, Picture, PicturePopularity, ScrapeRequest
+from pictures.parsers import registry
+from pictures.prefetch import prefetcher
+from pictures.scraping import scrape_picture, search_misses
+from pictures.serializers import (EpisodeManifestSerializer, LinkSerializer,
+                                  PicturePopularitySerializer)
+from pictures.throttling import GlobalScrapeThrottle, UserScrapeThrottle
+
+
+class ServiceUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Pictures source is temporarily unavailable, try again later."
+    default_code = "service_unavailable"
 
 
 class BasePictureListView(generics.ListAPIView):
-    """View for returning list of series filtered by name"""
+    """View for returning list of series filtered by name
+
+    Dead links are listed after alive ones, or hidden completely
+    with `hide_dead` query parameter. Links are read from Link table rather
+    than EpisodeManifest, because listed links expose their ids and liveness
+    which manifest doesn't store, see EpisodeManifestView for single row reads
+    """
     serializer_class = LinkSerializer
     permission_classes = (IsAuthenticated, )
 
     def get_queryset(self):
-        return Link.objects.filter(picture__name=self.kwargs["name"])
+        queryset = Link.objects.filter(picture__name=self.kwargs["name"]).select_related("picture")
+        if self.request.query_params.get("hide_dead"):
+            queryset = queryset.filter(is_dead=False)
+        return queryset.order_by("is_dead", "id")
 
 
 class FilmListView(BasePictureListView):
@@ -24,6 +48,12 @@ class FilmListView(BasePictureListView):
 
 
 class SeriesListView(BasePictureListView):
+    def get(self, request, *args, **kwargs):
+        """Lists episode links and warms upcoming episodes in background"""
+        response = super().get(request, *args, **kwargs)
+        prefetcher.schedule(self.kwargs["name"], self.kwargs["season"], self.kwargs["episode"])
+        return response
+
     def get_queryset(self):
         """Filters queryset by Series type"""
         queryset = super().get_queryset()
@@ -34,12 +64,47 @@ class SeriesListView(BasePictureListView):
         )
 
 
+class EpisodeManifestView(generics.RetrieveAPIView):
+    """View for returning all alive sources of picture from its manifest,
+    read path of clients which need only sources served by single row fetch
+    """
+    serializer_class = EpisodeManifestSerializer
+    permission_classes = (IsAuthenticated, )
+    queryset = EpisodeManifest.objects.select_related("picture")
+
+    def get_object(self):
+        """Returns manifest by picture name with single query"""
+        manifest = self.get_queryset().filter(picture__name=self.kwargs["name"]).first()
+        if manifest is None:
+            raise NotFound()
+        self.check_object_permissions(self.request, manifest)
+        return manifest
+
+
+class TrendingListView(generics.ListAPIView):
+    """View for returning pictures ordered by count of active watchers"""
+    serializer_class = PicturePopularitySerializer
+    permission_classes = (IsAuthenticated, )
+    queryset = (
+        PicturePopularity.objects.select_related("picture")
+        .filter(watchers__gt=0)
+        .order_by("-active_watchers", "-watchers", "picture_id")
+    )
+
+
 class PictureSearchView(views.APIView):
     """Caching view that retrieves source list from desired source and saves in database
     after this, redirects to actual database view list
+
+    Only searches missing in database are throttled, throttled ones are queued
     """
-    picture_parsers = (YandexParser(), )
     permission_classes = (IsAuthenticated, )
+    scrape_throttle_classes = (UserScrapeThrottle, GlobalScrapeThrottle)
+
+    @property
+    def picture_parsers(self):
+        """Parsers configured by settings.PICTURE_PARSERS"""
+        return registry.get_parsers()
 
     def get(self, request, picture_name):
         """Base get view
@@ -48,20 +113,60 @@ class PictureSearchView(views.APIView):
             request -- base drf request
             picture_name -- picture name in "word1_word2_etc" format (e.g. "doctor_house")
         """
-        links = Link.objects.filter(picture__name=picture_name)
-        if not links.exists():
-            links = self.parse_links(picture_name=picture_name)
-        else:
-            links = links.all()
+        # Ordering by picture lets planner start from picture name index instead of scanning all links
+        link = (
+            Link.objects.filter(picture__name=picture_name, is_dead=False)
+            .select_related("picture").order_by("picture_id", "id").first()
+        )
+        if link is not None:
+            return self.redirect(link.picture)
+        if search_misses.is_missing(picture_name):
+            raise NotFound()
+        if search_misses.is_failing(picture_name):
+            raise ServiceUnavailable()
+        if ScrapeRequest.objects.filter(picture_name=picture_name).exists():
+            return self.defer(picture_name)
+        wait = self.check_scrape_throttles(request)
+        if wait is not None:
+            return self.defer(picture_name, wait)
+        links = self.parse_links(picture_name=picture_name)
         return self.redirect(links[0].picture)
 
+    def check_scrape_throttles(self, request):
+        """Returns seconds to wait if request should be throttled, None otherwise.
+        Tokens taken by throttles which allowed rejected request are refunded
+
+        Attributes:
+            request -- base drf request
+        """
+        allowed = []
+        for throttle_class in self.scrape_throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                for allowed_throttle in allowed:
+                    allowed_throttle.refund(request)
+                return throttle.wait()
+            allowed.append(throttle)
+        return None
+
+    def defer(self, picture_name, wait=None):
+        """Queues picture search and responds with 202 Accepted
+
+        Attributes:
+            picture_name -- picture name given from request
+            wait         -- seconds after which client may retry
+        """
+        ScrapeRequest.enqueue(picture_name)
+        headers = {"Retry-After": str(int(wait) + 1)} if wait is not None else None
+        return Response({"detail": "Search is queued"}, status=status.HTTP_202_ACCEPTED, headers=headers)
+
     def redirect(self, picture):
         """Redirects to appropriate view using picture instance
 
         Attributes:
             picture -- database instance of picture
         """
-        base_kwargs = {"name": Picture.name}
+        base_kwargs = {"name": picture.name}
         if picture.type == Picture.SERIES:
             base_kwargs.update({"season": 1, "episode": 1})
             return redirect(reverse("pictures:series_list", kwargs=base_kwargs))
@@ -69,20 +174,25 @@ class PictureSearchView(views.APIView):
             return redirect(reverse("pictures:film_list", kwargs=base_kwargs))
 
     def parse_links(self, picture_name):
-        """Parses links with defined parsers in self.picture_parsers and saves it into database
+        """Parses links with parsers from self.picture_parsers and saves it into database
         with appropriate picture attributes
 
         Attributes:
             picture_name -- internal picture_name given from request
         """
-        sources = [source for parser in self.picture_parsers for source in parser.get_sources(picture_name)]
-        picture, _ = Picture.objects.get_or_create(name=sources[0].name, type=sources[0].type)
-        links = [Link(source=link.source_url, season=link.season, episode=link.episode, picture=picture)
-                 for link in sources]
-        return Link.objects.bulk_create(links)
-
-
-
-
-
-
+        try:
+            return scrape_picture(picture_name, self.picture_parsers)
+        except PictureNotFound:
+            raise NotFound()
+        except SourceUnavailable:
+            raise ServiceUnavailable()
+
+
+class CatalogExportView(views.APIView):
+    """Streams whole pictures catalog as json lines, see pictures.catalog"""
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        response = StreamingHttpResponse(export_catalog(), content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="catalog.jsonl"'
+        return response
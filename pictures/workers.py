@@ -0,0 +1,176 @@
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from pictures.models import ScrapeTask
+from pictures.parsers import registry
+from pictures.scraping import scrape_episode
+
+
+class ScrapeWorker:
+    """Runs episode scrape tasks stored in database, several workers may run
+    on different nodes at once
+
+    Tasks are claimed with SELECT ... FOR UPDATE SKIP LOCKED and leased for
+    lease_seconds, leases of running tasks are prolonged every
+    heartbeat_seconds. Tasks of dead worker become claimable when their lease
+    expires, unless they ran out of attempts, then they are failed. Claims of
+    the same source are serialized by advisory lock, so "max_tasks" limit of
+    parser holds across all workers.
+    """
+
+    def __init__(self, node: str, threads: int = 4, lease_seconds: int = 60,
+                 heartbeat_seconds: int = 20, max_attempts: int = 3):
+        self.node = node
+        self.threads = threads
+        self.lease = timedelta(seconds=lease_seconds)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_attempts = max_attempts
+        self._active: Dict[int, ScrapeTask] = {}
+        self._active_lock = threading.Lock()
+
+    def claimable(self, source: str):
+        """Returns queryset of tasks of source which may be claimed"""
+        expired = Q(
+            status=ScrapeTask.RUNNING, lease_expires_at__lt=timezone.now(), attempts__lt=self.max_attempts,
+        )
+        return ScrapeTask.objects.filter(Q(status=ScrapeTask.PENDING) | expired, source=source)
+
+    def fail_exhausted(self, source: str) -> int:
+        """Fails tasks of source which lease expired on the last attempt, e.g.
+        because they kill or hang their workers, returns count of failed tasks
+        """
+        return ScrapeTask.objects.filter(
+            source=source,
+            status=ScrapeTask.RUNNING,
+            lease_expires_at__lt=timezone.now(),
+            attempts__gte=self.max_attempts,
+        ).update(
+            status=ScrapeTask.FAILED,
+            leased_by="",
+            lease_expires_at=None,
+            error="Lease expired on the last attempt",
+            finished_at=timezone.now(),
+        )
+
+    def claim(self, source: str, limit: int) -> List[ScrapeTask]:
+        """Leases up to limit tasks of source, respecting its max_tasks limit
+
+        Attributes:
+            source -- parser name
+            limit  -- maximum count of tasks to claim
+        """
+        max_tasks = registry.get_config(source).get("max_tasks")
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [zlib.crc32(f"scrape_{source}".encode())])
+            self.fail_exhausted(source)
+            now = timezone.now()
+            if max_tasks is not None:
+                running = ScrapeTask.objects.filter(
+                    source=source, status=ScrapeTask.RUNNING, lease_expires_at__gte=now,
+                ).count()
+                limit = min(limit, max_tasks - running)
+            if limit <= 0:
+                return []
+            tasks = list(
+                self.claimable(source).select_for_update(skip_locked=True)
+                .select_related("picture").order_by("id")[:limit]
+            )
+            ScrapeTask.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                status=ScrapeTask.RUNNING,
+                leased_by=self.node,
+                lease_expires_at=now + self.lease,
+                attempts=F("attempts") + 1,
+            )
+        for task in tasks:
+            task.attempts += 1
+        return tasks
+
+    def heartbeat(self) -> int:
+        """Prolongs leases of running tasks, returns count of prolonged ones"""
+        with self._active_lock:
+            task_ids = list(self._active)
+        if not task_ids:
+            return 0
+        return ScrapeTask.objects.filter(
+            pk__in=task_ids, leased_by=self.node, status=ScrapeTask.RUNNING,
+        ).update(lease_expires_at=timezone.now() + self.lease)
+
+    def finish(self, task: ScrapeTask, error: str = ""):
+        """Stores result of task, unless task was reclaimed by other worker"""
+        if not error:
+            status = ScrapeTask.DONE
+        elif task.attempts < self.max_attempts:
+            status = ScrapeTask.PENDING
+        else:
+            status = ScrapeTask.FAILED
+        ScrapeTask.objects.filter(pk=task.pk, leased_by=self.node, status=ScrapeTask.RUNNING).update(
+            status=status,
+            leased_by="",
+            lease_expires_at=None,
+            error=error,
+            finished_at=timezone.now() if status != ScrapeTask.PENDING else None,
+        )
+
+    def execute(self, task: ScrapeTask):
+        """Scrapes episode of task with parser of its source, unavailable
+        source fails the task, so it's retried until max_attempts
+        """
+        try:
+            parser = registry.get_parsers_by_name()[task.source]
+            scrape_episode(task.picture, task.season, task.episode, parsers=[parser])
+        except Exception as error:
+            self.finish(task, error=repr(error))
+        else:
+            self.finish(task)
+
+    def _run_task(self, task: ScrapeTask):
+        try:
+            self.execute(task)
+        finally:
+            with self._active_lock:
+                self._active.pop(task.pk, None)
+            connection.close()
+
+    def run_once(self, executor: ThreadPoolExecutor) -> int:
+        """Claims tasks for free threads and submits them, returns count of claimed tasks"""
+        claimed = 0
+        for source in registry.get_parsers_by_name():
+            with self._active_lock:
+                free = self.threads - len(self._active)
+            if free <= 0:
+                break
+            for task in self.claim(source, free):
+                with self._active_lock:
+                    self._active[task.pk] = task
+                executor.submit(self._run_task, task)
+                claimed += 1
+        return claimed
+
+    def run(self, poll_interval: float = 5, stop: Optional[threading.Event] = None):
+        """Runs worker until stop is set
+
+        Attributes:
+            poll_interval -- seconds to wait when there is nothing to claim
+            stop          -- event stopping worker, runs forever by default
+        """
+        stop = stop or threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(stop, ), daemon=True)
+        heartbeat.start()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while not stop.is_set():
+                if not self.run_once(executor):
+                    stop.wait(poll_interval)
+        stop.set()
+
+    def _heartbeat_loop(self, stop: threading.Event):
+        while not stop.wait(self.heartbeat_seconds):
+            self.heartbeat()
+        connection.close()